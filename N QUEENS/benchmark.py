@@ -0,0 +1,232 @@
+import argparse
+import csv
+import itertools
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import compare_algorithms
+import stopping
+
+ALGORITHMS = ("ga", "firefly")
+
+# fields of every run record, in the order of the CSV columns:
+RECORD_FIELDS = ["algorithm", "n", "pop", "gens", "seed", "wall_time", "evaluations", "evals_per_sec",
+                 "generations", "solved", "time_to_solution", "best_fitness", "peak_memory_mb"]
+
+# modules loaded by headless jobs and pool workers, and the time a fresh interpreter may take to import
+# any of them (measured around 0.2s, against more than 1s when matplotlib and seaborn were imported):
+STARTUP_MODULES = ["queens", "n_queens", "firefly_solver", "compare_algorithms", "parallel", "islands"]
+STARTUP_TARGET = 0.5
+PLOTTING_MODULES = ("matplotlib", "seaborn")
+
+
+def runSolver(algorithm, n, pop, gens, seed):
+    """
+    Runs one of the compare_algorithms solvers, stopping at the first board with zero violations
+    :param algorithm: "ga" for run_genetic_algorithm() or "firefly" for FireflyAlgorithm.run()
+    :return: the result dictionary of the solver
+    """
+    stop = [stopping.TargetFitness(0)]
+    if algorithm == "ga":
+        return compare_algorithms.run_genetic_algorithm(n, pop, gens, seed=seed, stop=stop)
+    if algorithm == "firefly":
+        return compare_algorithms.FireflyAlgorithm(n, pop).run(gens, seed=seed, stop=stop)
+    raise ValueError("unknown algorithm: ", algorithm)
+
+
+def measureRun(algorithm, n, pop, gens, seed, repeats=1, memory=False):
+    """
+    Times one configuration with perf_counter(). The run is repeated with the same seed, which repeats
+    the same work, and the fastest wall time is kept. Since the solvers stop at the first solution,
+    the wall time of a solved run is also its time to first solution.
+    When memory is True, one more run is made under tracemalloc to measure the peak memory; it is not
+    part of the timing, since tracing slows the solvers down.
+    :return: a run record with the RECORD_FIELDS keys
+    """
+    wallTime = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = runSolver(algorithm, n, pop, gens, seed)
+        wallTime = min(wallTime, time.perf_counter() - start)
+
+    peakMemory = None
+    if memory:
+        tracemalloc.start()
+        try:
+            runSolver(algorithm, n, pop, gens, seed)
+            peakMemory = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+
+    solved = result["best_fitness"] == 0
+    return {
+        "algorithm": algorithm, "n": n, "pop": pop, "gens": gens, "seed": seed,
+        "wall_time": wallTime,
+        "evaluations": result["evaluations"],
+        "evals_per_sec": result["evaluations"] / wallTime if wallTime > 0 else None,
+        "generations": result["generations"],
+        "solved": solved,
+        "time_to_solution": wallTime if solved else None,
+        "best_fitness": float(result["best_fitness"]),
+        "peak_memory_mb": peakMemory,
+    }
+
+
+def measureStartup(module, repeats=5):
+    """
+    Times a fresh interpreter that imports the given module, as a worker process does, keeping the
+    fastest of the repeats, and checks that no plotting library was loaded on the way
+    :return: a dictionary with the module, its startup time in seconds and whether it loads plotting modules
+    """
+    code = "import sys, %s; print(any(name in sys.modules for name in %r))" % (module, PLOTTING_MODULES)
+    startupTime = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True)
+        startupTime = min(startupTime, time.perf_counter() - start)
+
+    return {"module": module, "startup_time": startupTime, "loads_plotting": result.stdout.strip() == "True"}
+
+
+def checkStartup(modules=STARTUP_MODULES, target=STARTUP_TARGET, repeats=5):
+    """
+    :return: a list of messages, one per module that is slower to import than the target or loads plotting modules
+    """
+    problems = []
+    for module in modules:
+        entry = measureStartup(module, repeats)
+        print("%-20s %8.3fs  plotting=%s" % (module, entry["startup_time"], entry["loads_plotting"]))
+        if entry["startup_time"] > target:
+            problems.append("%s: startup %.3fs, target %.3fs" % (module, entry["startup_time"], target))
+        if entry["loads_plotting"]:
+            problems.append("%s: imports a plotting library at load time" % module)
+    return problems
+
+
+def configKey(record):
+    return "%s/n=%d/pop=%d/gens=%d" % (record["algorithm"], record["n"], record["pop"], record["gens"])
+
+
+def summarize(records):
+    """
+    Aggregates the run records of every configuration over its seeds
+    :return: a dictionary from configKey() to the summary of the configuration
+    """
+    groups = {}
+    for record in records:
+        groups.setdefault(configKey(record), []).append(record)
+
+    summary = {}
+    for key, runs in groups.items():
+        solvedTimes = [run["time_to_solution"] for run in runs if run["solved"]]
+        memory = [run["peak_memory_mb"] for run in runs if run["peak_memory_mb"] is not None]
+        summary[key] = {
+            "runs": len(runs),
+            "median_wall_time": statistics.median(run["wall_time"] for run in runs),
+            "median_evals_per_sec": statistics.median(run["evals_per_sec"] or 0.0 for run in runs),
+            "success_rate": len(solvedTimes) / len(runs),
+            "median_time_to_solution": statistics.median(solvedTimes) if solvedTimes else None,
+            "max_peak_memory_mb": max(memory) if memory else None,
+        }
+    return summary
+
+
+def checkRegressions(summary, baseline, tolerance):
+    """
+    Compares a summary with a baseline summary of the same configurations
+    :param tolerance: the allowed relative slowdown of the median wall time, e.g. 0.1 for 10%
+    :return: a list of messages, one per regression found
+    """
+    regressions = []
+    for key, current in summary.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        if current["median_wall_time"] > reference["median_wall_time"] * (1 + tolerance):
+            regressions.append("%s: median wall time %.4fs, baseline %.4fs" %
+                               (key, current["median_wall_time"], reference["median_wall_time"]))
+        if current["success_rate"] < reference["success_rate"]:
+            regressions.append("%s: success rate %.2f, baseline %.2f" %
+                               (key, current["success_rate"], reference["success_rate"]))
+    return regressions
+
+
+def runSuite(algorithms, sizes, populations, generations, seeds, repeats=1, memory=False, verbose=True):
+    """
+    Sweeps every combination of the given algorithms, N, population sizes, generations and seeds
+    :return: the list of run records
+    """
+    records = []
+    for algorithm, n, pop, gens, seed in itertools.product(algorithms, sizes, populations, generations, seeds):
+        record = measureRun(algorithm, n, pop, gens, seed, repeats, memory)
+        records.append(record)
+        if verbose:
+            print("%-40s seed=%-6d %8.4fs  solved=%s" % (configKey(record), seed, record["wall_time"],
+                                                         record["solved"]))
+    return records
+
+
+def writeCsv(records, path):
+    with open(path, mode='w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=RECORD_FIELDS)
+        writer.writeheader()
+        writer.writerows(records)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Multi-seed benchmark of the compare_algorithms solvers")
+    parser.add_argument("--algorithms", nargs="+", choices=ALGORITHMS, default=list(ALGORITHMS))
+    parser.add_argument("--n", nargs="+", type=int, default=[8, 16])
+    parser.add_argument("--pop", nargs="+", type=int, default=[60])
+    parser.add_argument("--gens", nargs="+", type=int, default=[60])
+    parser.add_argument("--seeds", nargs="+", type=int, default=[1, 2, 3, 4, 5])
+    parser.add_argument("--repeats", type=int, default=1, help="timed repetitions of every run, the fastest is kept")
+    parser.add_argument("--memory", action="store_true", help="also measure the peak memory with tracemalloc")
+    parser.add_argument("--json", default="benchmark_results.json", help="where to write the records and summary")
+    parser.add_argument("--csv", help="where to write the run records as CSV")
+    parser.add_argument("--baseline", help="a previous --json output to check for regressions against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative slowdown")
+    parser.add_argument("--startup", action="store_true",
+                        help="only check the headless import time of the solver modules against STARTUP_TARGET")
+    args = parser.parse_args(argv)
+
+    if args.startup:
+        problems = checkStartup(repeats=max(args.repeats, 5))
+        for message in problems:
+            print("STARTUP:", message)
+        return 1 if problems else 0
+
+    records = runSuite(args.algorithms, args.n, args.pop, args.gens, args.seeds, args.repeats, args.memory)
+    summary = summarize(records)
+
+    with open(args.json, mode='w', encoding='utf-8') as f:
+        json.dump({"records": records, "summary": summary}, f, indent=2)
+    if args.csv:
+        writeCsv(records, args.csv)
+
+    print("\n%-40s %12s %14s %8s" % ("configuration", "median (s)", "evals/s", "success"))
+    for key, entry in summary.items():
+        print("%-40s %12.4f %14.0f %8.2f" % (key, entry["median_wall_time"], entry["median_evals_per_sec"],
+                                             entry["success_rate"]))
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)["summary"]
+        regressions = checkRegressions(summary, baseline, args.tolerance)
+        for message in regressions:
+            print("REGRESSION:", message)
+        if regressions:
+            return 1
+        print("No regressions against", args.baseline)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+import os
+import pickle
+import random
+import threading
+import zlib
+
+import numpy as np
+
+
+def rngState():
+    """
+    :return: the state of the Python and NumPy global random generators
+    """
+    return {'random': random.getstate(), 'numpy': np.random.get_state()}
+
+
+def setRngState(state):
+    """
+    Restores the global random generators from a state returned by rngState()
+    """
+    random.setstate(state['random'])
+    np.random.set_state(state['numpy'])
+
+
+def load(path):
+    """
+    :param path: a file written by Checkpointer.save()
+    :return: the state dictionary that was saved
+    """
+    with open(path, mode='rb') as f:
+        return pickle.loads(zlib.decompress(f.read()))
+
+
+class Checkpointer:
+    """Periodically saves the state of a run, so that it can be resumed after a crash.
+    The state is pickled in the calling thread, which takes a consistent snapshot of the population
+    before the next generation changes it; compressing and writing the file is left to a background
+    thread. The file is first written under a temporary name and then renamed over the previous
+    checkpoint, so a crash during a write never leaves a truncated checkpoint behind.
+    """
+
+    def __init__(self, path, interval=10):
+        """
+        :param path: the checkpoint file
+        :param interval: the number of generations between two checkpoints
+        """
+        if interval <= 0:
+            raise ValueError("interval should be a positive number, got ", interval)
+
+        self.path = path
+        self.interval = interval
+        self.saves = 0
+        self._thread = None
+        self._error = None
+
+    def due(self, gen):
+        """
+        :return: True if a checkpoint should be saved after the given generation
+        """
+        return gen % self.interval == 0
+
+    def save(self, state):
+        """
+        Snapshots the given state and writes it in the background, after the previous write is done
+        :param state: a picklable dictionary
+        """
+        data = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+        self.wait()
+        self._thread = threading.Thread(target=self._write, args=(data,), daemon=True)
+        self._thread.start()
+        self.saves += 1
+
+    def wait(self):
+        """
+        Blocks until the pending write, if any, is on disk, and raises the error it may have failed with
+        """
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def remove(self):
+        """
+        Deletes the checkpoint once the run is finished, so that the next run starts from scratch
+        instead of resuming the finished one
+        """
+        self.wait()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _write(self, data):
+        try:
+            temporary = self.path + ".tmp"
+            with open(temporary, mode='wb') as f:
+                f.write(zlib.compress(data))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporary, self.path)
+        except OSError as error:
+            self._error = error
@@ -2,12 +2,13 @@ import time
 import random
 import array
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 
 # DEAP imports
 from deap import base, creator, tools, algorithms
 
+from queens import countDiagonalViolations
+import stopping
+
 # --- 1. CLASE DEL PROBLEMA (El Árbitro Común) ---
 class NQueensProblem:
     def __init__(self, numOfQueens):
@@ -15,19 +16,48 @@ class NQueensProblem:
 
     def getViolationsCount(self, positions):
         # Misma función de fitness para ambos para ser justos
-        violations = 0
-        for i in range(len(positions)):
-            for j in range(i + 1, len(positions)):
-                column1 = i
-                row1 = positions[i]
-                column2 = j
-                row2 = positions[j]
-                if abs(column1 - column2) == abs(row1 - row2):
-                    violations += 1
-        return violations
+        # Conteo O(N) por diagonales: mismo resultado que comparar cada par de reinas
+        return countDiagonalViolations(positions)
 
 # --- 2. SOLVER GENÉTICO (DEAP) ---
-def run_genetic_algorithm(n_queens, pop_size, max_gen, seed=42):
+def ea_simple_con_paro(population, toolbox, cxpb, mutpb, ngen, stats, halloffame, stop=None, telemetry=None):
+    # Igual que algorithms.eaSimple (selección + varAnd, la descendencia reemplaza a toda la población),
+    # pero revisa los criterios de paro después de cada generación, como elitism.eaSimpleWithElitism
+    logbook = tools.Logbook()
+    logbook.header = ['gen', 'nevals'] + (stats.fields if stats else [])
+
+    def evaluar(individuos):
+        invalid_ind = [ind for ind in individuos if not ind.fitness.valid]
+        for ind, fit in zip(invalid_ind, toolbox.map(toolbox.evaluate, invalid_ind)):
+            ind.fitness.values = fit
+        return len(invalid_ind)
+
+    def registrar(gen, nevals):
+        halloffame.update(population)
+        logbook.record(gen=gen, nevals=nevals, **(stats.compile(population) if stats else {}))
+        if telemetry is not None:
+            telemetry.emit(logbook[-1])
+        return stopper.check(gen, halloffame[0].fitness.values[0], nevals)
+
+    stopper = stopping.Stopper(stop)
+    reason = registrar(0, evaluar(population))
+
+    gen = 1
+    while reason is None and gen <= ngen:
+        offspring = toolbox.select(population, len(population))
+        offspring = algorithms.varAnd(offspring, toolbox, cxpb, mutpb)
+        nevals = evaluar(offspring)
+        population[:] = offspring
+        reason = registrar(gen, nevals)
+        gen += 1
+
+    if reason is not None:
+        logbook[-1]['stop'] = reason
+    return population, logbook
+
+def run_genetic_algorithm(n_queens, pop_size, max_gen, seed=42, stop=None, telemetry=None):
+    # stop: lista de criterios de paro (módulo stopping), p. ej. [stopping.TargetFitness(0)]
+    # telemetry: telemetry.TelemetrySink opcional, recibe cada registro del logbook
     random.seed(seed)
     
     # Configuración DEAP (recreada localmente para evitar errores globales)
@@ -56,12 +86,15 @@ def run_genetic_algorithm(n_queens, pop_size, max_gen, seed=42):
     stats = tools.Statistics(lambda ind: ind.fitness.values)
     stats.register("min", np.min)
     
-    # Ejecución
-    start_time = time.time()
-    pop, logbook = algorithms.eaSimple(pop, toolbox, cxpb=0.9, mutpb=0.1, ngen=max_gen, stats=stats, verbose=False)
-    end_time = time.time()
+    # Ejecución: mismo ciclo que algorithms.eaSimple (sin elitismo), con los criterios de paro.
+    # El salón de la fama solo registra el mejor encontrado, no vuelve a entrar a la población.
+    hof = tools.HallOfFame(1)
+    start_time = time.perf_counter()
+    pop, logbook = ea_simple_con_paro(pop, toolbox, cxpb=0.9, mutpb=0.1, ngen=max_gen, stats=stats,
+                                      halloffame=hof, stop=stop, telemetry=telemetry)
+    end_time = time.perf_counter()
     
-    best_ind = tools.selBest(pop, 1)[0]
+    best_ind = hof.items[0]
     min_history = logbook.select("min")
     
     return {
@@ -69,7 +102,10 @@ def run_genetic_algorithm(n_queens, pop_size, max_gen, seed=42):
         "best_fitness": best_ind.fitness.values[0],
         "time": end_time - start_time,
         "history": min_history,
-        "best_sol": best_ind
+        "best_sol": best_ind,
+        "stop": logbook[-1].get("stop"),
+        "generations": logbook[-1]["gen"],
+        "evaluations": sum(logbook.select("nevals"))
     }
 
 # --- 3. SOLVER LUCIÉRNAGA (Firefly) ---
@@ -81,18 +117,32 @@ class FireflyAlgorithm:
         self.problem = NQueensProblem(n_queens)
         self.population = []
         self.fitnesses = []
+        self.evaluations = 0
 
-    def run(self, max_generations, seed=42):
+    def run(self, max_generations, seed=42, stop=None, telemetry=None):
+        # stop: lista de criterios de paro (módulo stopping); sin criterios corre todas las generaciones
+        # telemetry: telemetry.TelemetrySink opcional, recibe un registro por generación
         random.seed(seed)
         self.population = [random.sample(range(self.n_queens), self.n_queens) for _ in range(self.pop_size)]
         self.fitnesses = [self.problem.getViolationsCount(ind) for ind in self.population]
+        self.evaluations = self.pop_size
         
         history = []
-        start_time = time.time()
+        stopper = stopping.Stopper(stop)
+        reason = None
+        start_time = time.perf_counter()
         
         for t in range(max_generations):
             # Guardar mejor de esta generación para el historial
             history.append(min(self.fitnesses))
+            if telemetry is not None:
+                telemetry.emit({'gen': t, 'min': history[-1], 'avg': sum(self.fitnesses) / self.pop_size,
+                                'nevals': self.evaluations - stopper.nevals})
+
+            # Criterios de paro, revisados con el estado al inicio de la generación
+            reason = stopper.check(t, history[-1], self.evaluations - stopper.nevals)
+            if reason is not None:
+                break
             
             for i in range(self.pop_size):
                 for j in range(self.pop_size):
@@ -111,11 +161,12 @@ class FireflyAlgorithm:
                                 new_pos[idx1], new_pos[idx2] = new_pos[idx2], new_pos[idx1]
                             
                             new_fitness = self.problem.getViolationsCount(new_pos)
+                            self.evaluations += 1
                             # Aceptamos si mejora (o comportamiento estándar Firefly)
                             self.population[i] = new_pos
                             self.fitnesses[i] = new_fitness
 
-        end_time = time.time()
+        end_time = time.perf_counter()
         best_idx = np.argmin(self.fitnesses)
         
         return {
@@ -123,7 +174,10 @@ class FireflyAlgorithm:
             "best_fitness": self.fitnesses[best_idx],
             "time": end_time - start_time,
             "history": history,
-            "best_sol": self.population[best_idx]
+            "best_sol": self.population[best_idx],
+            "stop": reason,
+            "generations": len(history) - 1 if reason is not None else len(history),
+            "evaluations": self.evaluations
         }
 
 # --- 4. COMPARACIÓN PRINCIPAL ---
@@ -132,17 +186,18 @@ if __name__ == "__main__":
     N_QUEENS = 16
     POPULATION = 60   # Mismo tamaño para ambos
     GENERATIONS = 60# ismas iteraciones
+    PARO = [stopping.TargetFitness(0)]   # Ambos se detienen al encontrar un tablero sin violaciones
     
     print(f"--- COMPARANDO ALGORITMOS (N={N_QUEENS}) ---")
     
     # 1. Correr Genético
     print("Ejecutando Genético...")
-    res_ga = run_genetic_algorithm(N_QUEENS, POPULATION, GENERATIONS)
+    res_ga = run_genetic_algorithm(N_QUEENS, POPULATION, GENERATIONS, stop=PARO)
     
     # 2. Correr Luciérnaga
     print("Ejecutando Luciérnaga...")
     solver_fa = FireflyAlgorithm(N_QUEENS, POPULATION)
-    res_fa = solver_fa.run(GENERATIONS)
+    res_fa = solver_fa.run(GENERATIONS, stop=PARO)
     
     # 3. Mostrar Resultados Numéricos
     print("\n--- RESULTADOS ---")
@@ -153,7 +208,8 @@ if __name__ == "__main__":
         success = "SÍ" if res['best_fitness'] == 0 else "NO"
         print(f"{res['name']:<20} | {res['time']:.4f}     | {res['best_fitness']:<15} | {success}")
 
-    # 4. Gráfica de Convergencia
+    # 4. Gráfica de Convergencia (matplotlib solo se carga al graficar)
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(10, 6))
     plt.plot(res_ga['history'], label='Genético (DEAP)', color='blue', linewidth=2)
     plt.plot(res_fa['history'], label='Luciérnaga (Firefly)', color='orange', linewidth=2, linestyle='--')
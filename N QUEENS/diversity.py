@@ -0,0 +1,106 @@
+import numpy as np
+from deap import tools
+
+# Population diversity metrics computed from the value counts of every column, in O(P * N log P) time
+# and O(P * N) memory for P boards of N queens, instead of comparing all the P * (P - 1) / 2 pairs.
+
+DIVERSITY_FIELDS = ['hamming', 'entropy', 'unique']
+
+
+def asBoards(population):
+    """
+    :param population: a list of individuals (DEAP individuals, population.IndividualView handles or plain
+    sequences) or a 2-D array
+    :return: a (P x N) int array with one board per row
+    """
+    if isinstance(population, np.ndarray):
+        return population
+    return np.array([getattr(individual, 'genome', individual) for individual in population])
+
+
+def _columnRuns(boards):
+    # sorting every column groups its equal values into runs; returns the length of every run and the
+    # column it belongs to:
+    popSize = boards.shape[0]
+    columns = np.sort(boards, axis=0).T
+    starts = np.ones(columns.shape, dtype=bool)
+    starts[:, 1:] = columns[:, 1:] != columns[:, :-1]
+    runStarts = np.flatnonzero(starts)
+    lengths = np.diff(np.append(runStarts, starts.size))
+    return lengths, runStarts // popSize
+
+
+def meanHammingDistance(boards):
+    """
+    Calculates the mean Hamming distance over all the pairs of boards: two boards agree in a column
+    exactly when they hold the same value there, so the agreeing pairs of every column follow from the
+    count c of each value, as c * (c - 1) / 2.
+    :param boards: a (P x N) int array
+    :return: the mean number of positions in which two boards differ
+    """
+    boards = asBoards(boards)
+    popSize, numOfQueens = boards.shape
+    if popSize < 2:
+        return 0.0
+    lengths, _ = _columnRuns(boards)
+    agreeing = (lengths * (lengths - 1) // 2).sum()
+    return numOfQueens - agreeing / (popSize * (popSize - 1) / 2)
+
+
+def columnEntropy(boards):
+    """
+    :param boards: a (P x N) int array
+    :return: the Shannon entropy of the values of every column, normalized to [0, 1] by log(N)
+    """
+    boards = asBoards(boards)
+    popSize, numOfQueens = boards.shape
+    if numOfQueens < 2:
+        return np.zeros(numOfQueens)
+    lengths, columns = _columnRuns(boards)
+    p = lengths / popSize
+    return np.bincount(columns, weights=-p * np.log(p), minlength=numOfQueens) / np.log(numOfQueens)
+
+
+def uniqueCount(boards):
+    """
+    :param boards: a (P x N) int array
+    :return: the number of distinct boards
+    """
+    boards = np.ascontiguousarray(asBoards(boards))
+    if len(boards) == 0:
+        return 0
+    rows = boards.view(np.dtype((np.void, boards.dtype.itemsize * boards.shape[1])))
+    return len(np.unique(rows))
+
+
+def diversity(population):
+    """
+    :param population: see asBoards()
+    :return: a dictionary with the DIVERSITY_FIELDS: the mean pairwise Hamming distance, the mean
+    normalized column entropy and the number of distinct boards
+    """
+    boards = asBoards(population)
+    return {'hamming': float(meanHammingDistance(boards)),
+            'entropy': float(columnEntropy(boards).mean()) if boards.size else 0.0,
+            'unique': uniqueCount(boards)}
+
+
+class DiversityStatistics(tools.Statistics):
+    """A tools.Statistics that adds the diversity() fields of the whole population to every record.
+    The key and the registered functions work as in tools.Statistics, e.g. on the fitness values; the
+    diversity fields are flat and come after the registered ones, so they can be selected from the
+    logbook like 'min' and 'avg'.
+    """
+
+    def __init__(self, key=lambda obj: obj):
+        super().__init__(key)
+        self.fields = list(DIVERSITY_FIELDS)
+
+    def register(self, name, function, *args, **kargs):
+        super().register(name, function, *args, **kargs)
+        self.fields = [field for field in self.fields if field not in DIVERSITY_FIELDS] + DIVERSITY_FIELDS
+
+    def compile(self, data):
+        record = super().compile(data)
+        record.update(diversity(data))
+        return record
@@ -1,61 +1,381 @@
-from deap import tools
-from deap import algorithms
+import random
+from bisect import bisect_right
+
+import numpy as np
+from deap import algorithms, tools
+
+import checkpoint
+import profiling
+import stopping
+
+
+class ReferenceHallOfFame(tools.HallOfFame):
+    """A HallOfFame that keeps references to the individuals instead of deep copies of them.
+    This is only safe when the individuals are never modified in place once they have a fitness,
+    which is what varAndCopyOnWrite() guarantees: an individual is cloned right before it is changed.
+    """
+
+    def insert(self, item):
+        i = bisect_right(self.keys, item.fitness)
+        self.items.insert(len(self) - i, item)
+        self.keys.insert(i, item.fitness)
+
+
+def evaluateInvalid(individuals, toolbox, batchEvaluate=False, fitnessCache=None):
+    """Evaluates the individuals with an invalid fitness and returns the ones that were actually evaluated.
+    By default every individual is evaluated separately through toolbox.map(toolbox.evaluate, ...).
+    When batchEvaluate is True, all of them are stacked into a single (k x N) int array and passed
+    to toolbox.evaluateBatch, which returns the k fitness values (or a k x number-of-objectives array).
+    When a fitnessCache (fitness_cache.FitnessCache) is given, boards found in it are not evaluated,
+    and identical boards are only evaluated once.
+    """
+    invalid_ind = [ind for ind in individuals if not ind.fitness.valid]
+
+    if fitnessCache is not None:
+        pending = {}
+        for ind in invalid_ind:
+            key = fitnessCache.key(ind)
+            fit = fitnessCache.get(key) if key not in pending else None
+            if fit is None:
+                pending.setdefault(key, []).append(ind)
+            else:
+                ind.fitness.values = fit
+        keys = list(pending)
+        invalid_ind = [pending[key][0] for key in keys]
+
+    if not invalid_ind:
+        return invalid_ind
+
+    if batchEvaluate:
+        fitnesses = np.asarray(toolbox.evaluateBatch(np.array(invalid_ind, dtype=np.int32)))
+        if fitnesses.ndim == 1:
+            fitnesses = fitnesses[:, np.newaxis]
+        fitnesses = [tuple(fit) for fit in fitnesses.tolist()]
+    else:
+        fitnesses = toolbox.map(toolbox.evaluate, invalid_ind)
+
+    for ind, fit in zip(invalid_ind, fitnesses):
+        ind.fitness.values = fit
+
+    if fitnessCache is not None:
+        for key in keys:
+            duplicates = pending[key]
+            fit = duplicates[0].fitness.values
+            for ind in duplicates[1:]:
+                ind.fitness.values = fit
+            fitnessCache.put(key, fit)
+
+    return invalid_ind
+
+
+def _updateHallOfFame(halloffame, individuals):
+    # updates the hall of fame and returns the number of individuals it copied:
+    previous = set(map(id, halloffame.items))
+    halloffame.update(individuals)
+    if isinstance(halloffame, ReferenceHallOfFame):
+        return 0
+    return sum(1 for item in halloffame.items if id(item) not in previous)
+
+
+def _cacheRecord(fitnessCache, previousCounters):
+    # the cache counters are cumulative, the logbook gets the per-generation differences:
+    if fitnessCache is None:
+        return previousCounters, {}
+    counters = fitnessCache.counters()
+    return counters, {name: counters[name] - previousCounters[name] for name in counters}
+
+
+def varAndCopyOnWrite(population, toolbox, cxpb, mutpb):
+    """Same as DEAP varAnd(), with the same random decisions, but the selected individuals are not cloned
+    up front: the offspring list starts with references to them, and an individual is only cloned
+    right before crossover or mutation changes it. Individuals left unchanged (and the elites) are
+    shared between the generations.
+    :return: the offspring and the number of clones made
+    """
+    offspring = list(population)
+    cloned = [False] * len(offspring)
+
+    def writable(i):
+        if not cloned[i]:
+            offspring[i] = toolbox.clone(offspring[i])
+            cloned[i] = True
+
+    # Apply crossover and mutation on the offspring
+    for i in range(1, len(offspring), 2):
+        if random.random() < cxpb:
+            writable(i - 1)
+            writable(i)
+            offspring[i - 1], offspring[i] = toolbox.mate(offspring[i - 1], offspring[i])
+            del offspring[i - 1].fitness.values, offspring[i].fitness.values
+
+    for i in range(len(offspring)):
+        if random.random() < mutpb:
+            writable(i)
+            offspring[i], = toolbox.mutate(offspring[i])
+            del offspring[i].fitness.values
+
+    return offspring, sum(cloned)
+
+
+# the phases timed by eaSimpleWithElitism() when a profiler is given ('localsearch' only runs, and is
+# only recorded, when a localSearch stage is given):
+PROFILED_PHASES = ['select', 'variation', 'evaluation', 'localsearch', 'halloffame', 'statistics']
+
+
+def _localSearch(localSearch, individuals, toolbox, profiler):
+    # runs the memetic refinement stage, if any, and returns its logbook fields:
+    if localSearch is None:
+        return {}
+    nlocal = localSearch(individuals, toolbox.clone)
+    profiler.lap('localsearch')
+    return {'nlocal': nlocal}
+
+
+def _timingRecord(profiler, phases):
+    # the logbook fields of the generation that just ended, with a 0.0 for the phases it skipped:
+    timings = profiler.end()
+    if not profiler:
+        return {}
+    return {'t_' + phase: timings.get(phase, 0.0) for phase in phases}
+
 
 def eaSimpleWithElitism(population, toolbox, cxpb, mutpb, ngen, stats=None,
-             halloffame=None, verbose=__debug__):
+             halloffame=None, verbose=__debug__, batchEvaluate=False,
+             fitnessCache=None, copyOnWrite=False, stop=None, profiler=None, checkpointer=None, resume=None,
+             telemetry=None, localSearch=None):
     """This algorithm is similar to DEAP eaSimple() algorithm, with the modification that
     halloffame is used to implement an elitism mechanism. The individuals contained in the
     halloffame are directly injected into the next generation and are not subject to the
     genetic operators of selection, crossover and mutation.
+    Set batchEvaluate to True to evaluate each generation with a single call to toolbox.evaluateBatch
+    instead of mapping toolbox.evaluate over the individuals (see evaluateInvalid()).
+    When a fitnessCache is given, boards that were already evaluated are looked up instead, and the
+    per-generation cache hits, misses and evictions are recorded in the logbook.
+    Set copyOnWrite to True to only clone the individuals that crossover or mutation actually change
+    (see varAndCopyOnWrite()); together with a ReferenceHallOfFame, the elites are then carried over by
+    reference. The 'ncopies' logbook column counts the individuals copied in every generation, by the
+    variation and by the hall of fame.
+    stop is an optional list of stopping.StoppingCriterion objects, checked after every generation
+    against the best fitness in the hall of fame; when one of them fires, the flow ends early and its
+    reason is stored under 'stop' in the last logbook record.
+    When a profiling.PhaseTimer is given as profiler, the seconds every generation spends in selection,
+    variation, evaluation, hall of fame update and statistics are recorded in the logbook, under
+    't_select', 't_variation', 't_evaluation', 't_halloffame' and 't_statistics' (and the local search
+    stage under 't_localsearch', when there is one).
+    When a checkpoint.Checkpointer is given, the population, hall of fame, fitness cache, logbook,
+    stopping criteria and random generators states are saved every checkpointer.interval generations.
+    To continue a run, pass the state returned by checkpoint.load() as resume, together with the same
+    toolbox and parameters: the population, halloffame and fitnessCache are restored in place, and the
+    run goes on exactly as if it was never interrupted (if the checkpoint was saved without a fitness
+    cache, a given fitnessCache starts empty).
+    localSearch is an optional memetic refinement stage, called as localSearch(individuals, toolbox.clone)
+    after every evaluation (see localsearch.MinConflictsRefinement); it may replace individuals of the list
+    by improved ones and returns the evaluations it spent, which are recorded under 'nlocal' and counted
+    by the stopping criteria.
+    Every logbook record is also emitted to the telemetry sink, if given (see telemetry.TelemetrySink);
+    for headless runs, set verbose to False and follow the sink with the telemetry viewer instead.
     """
+    profiler = profiler or profiling.NULL_TIMER
     logbook = tools.Logbook()
-    logbook.header = ['gen', 'nevals'] + (stats.fields if stats else [])
-
-    # Evaluate the individuals with an invalid fitness
-    invalid_ind = [ind for ind in population if not ind.fitness.valid]
-    fitnesses = toolbox.map(toolbox.evaluate, invalid_ind)
-    for ind, fit in zip(invalid_ind, fitnesses):
-        ind.fitness.values = fit
+    logbook.header = ['gen', 'nevals', 'ncopies'] + (['nlocal'] if localSearch else [])
+    logbook.header += stats.fields if stats else []
+    phases = [phase for phase in PROFILED_PHASES if localSearch or phase != 'localsearch']
+    if profiler:
+        logbook.header += ['t_' + phase for phase in phases]
+    cacheCounters = {}
+    if fitnessCache is not None:
+        cacheCounters = fitnessCache.counters()
+        logbook.header += list(cacheCounters)
 
     if halloffame is None:
         raise ValueError("halloffame parameter must not be empty!")
 
-    halloffame.update(population)
-    hof_size = len(halloffame.items) if halloffame.items else 0
+    if resume is None:
+        # Evaluate the individuals with an invalid fitness
+        profiler.start()
+        invalid_ind = evaluateInvalid(population, toolbox, batchEvaluate, fitnessCache)
+        profiler.lap('evaluation')
+        localRecord = _localSearch(localSearch, population, toolbox, profiler)
 
-    record = stats.compile(population) if stats else {}
-    logbook.record(gen=0, nevals=len(invalid_ind), **record)
-    if verbose:
-        print(logbook.stream)
+        ncopies = _updateHallOfFame(halloffame, population)
+        profiler.lap('halloffame')
+
+        record = stats.compile(population) if stats else {}
+        profiler.lap('statistics')
+        cacheCounters, cacheRecord = _cacheRecord(fitnessCache, cacheCounters)
+        logbook.record(gen=0, nevals=len(invalid_ind), ncopies=ncopies, **localRecord, **record, **cacheRecord,
+                       **_timingRecord(profiler, phases))
+        if telemetry is not None:
+            telemetry.emit(logbook[-1])
+        if verbose:
+            print(logbook.stream)
+
+        stopper = stopping.Stopper(stop)
+        reason = stopper.check(0, halloffame[0].fitness.values[0], len(invalid_ind) + localRecord.get('nlocal', 0))
+        startGen = 1
+    else:
+        # the population and hall of fame were pickled together, so the elites kept by reference
+        # are still shared with the population:
+        population[:] = resume['population']
+        halloffame.__dict__.update(resume['halloffame'].__dict__)
+        if fitnessCache is not None and resume['fitnessCache'] is not None:
+            fitnessCache.__dict__.update(resume['fitnessCache'].__dict__)
+            cacheCounters = resume['cacheCounters']
+        # a checkpoint saved without a fitness cache continues with the given cache empty
+        logbook = resume['logbook']
+        stopper = resume['stopper']
+        checkpoint.setRngState(resume['rng'])
+        reason = None
+        startGen = resume['gen'] + 1
+
+    hof_size = len(halloffame.items) if halloffame.items else 0
 
     # Begin the generational process
-    for gen in range(1, ngen + 1):
+    for gen in range(startGen, ngen + 1):
+        if reason is not None:
+            break
 
         # Select the next generation individuals
+        profiler.start()
         offspring = toolbox.select(population, len(population) - hof_size)
+        profiler.lap('select')
 
         # Vary the pool of individuals
-        offspring = algorithms.varAnd(offspring, toolbox, cxpb, mutpb)
+        if copyOnWrite:
+            offspring, ncopies = varAndCopyOnWrite(offspring, toolbox, cxpb, mutpb)
+        else:
+            offspring = algorithms.varAnd(offspring, toolbox, cxpb, mutpb)
+            ncopies = len(offspring)
+        profiler.lap('variation')
 
         # Evaluate the individuals with an invalid fitness
-        invalid_ind = [ind for ind in offspring if not ind.fitness.valid]
-        fitnesses = toolbox.map(toolbox.evaluate, invalid_ind)
-        for ind, fit in zip(invalid_ind, fitnesses):
-            ind.fitness.values = fit
+        invalid_ind = evaluateInvalid(offspring, toolbox, batchEvaluate, fitnessCache)
+        profiler.lap('evaluation')
+
+        # Refine the best offspring with local search, if requested
+        localRecord = _localSearch(localSearch, offspring, toolbox, profiler)
 
         # add the best back to population:
         offspring.extend(halloffame.items)
 
         # Update the hall of fame with the generated individuals
-        halloffame.update(offspring)
+        ncopies += _updateHallOfFame(halloffame, offspring)
 
         # Replace the current population by the offspring
         population[:] = offspring
+        profiler.lap('halloffame')
 
         # Append the current generation statistics to the logbook
         record = stats.compile(population) if stats else {}
-        logbook.record(gen=gen, nevals=len(invalid_ind), **record)
+        profiler.lap('statistics')
+        cacheCounters, cacheRecord = _cacheRecord(fitnessCache, cacheCounters)
+        logbook.record(gen=gen, nevals=len(invalid_ind), ncopies=ncopies, **localRecord, **record, **cacheRecord,
+                       **_timingRecord(profiler, phases))
+        if telemetry is not None:
+            telemetry.emit(logbook[-1])
         if verbose:
             print(logbook.stream)
 
+        reason = stopper.check(gen, halloffame[0].fitness.values[0], len(invalid_ind) + localRecord.get('nlocal', 0))
+
+        if checkpointer is not None and reason is None and checkpointer.due(gen):
+            checkpointer.save(dict(gen=gen, population=population, halloffame=halloffame,
+                                   fitnessCache=fitnessCache, cacheCounters=cacheCounters, logbook=logbook,
+                                   stopper=stopper, rng=checkpoint.rngState()))
+
+    if checkpointer is not None:
+        checkpointer.wait()
+
+    if reason is not None:
+        logbook[-1]['stop'] = reason
+        if verbose:
+            print("Stopped at generation %d: %s" % (logbook[-1]['gen'], reason))
+
     return population, logbook
+
+
+def eaSimpleWithElitismStore(store, toolbox, cxpb, mutpb, ngen, hofSize, stats=None, verbose=__debug__,
+                             stop=None, telemetry=None, batchVariation=False):
+    """Same flow as eaSimpleWithElitism(), working on a population.PopulationStore instead of a list of
+    individuals. Selection and elitism are done by row index (toolbox.selectIndices takes the fitness
+    vector and the number of rows to select), the genetic operators are applied in place on the rows
+    of the store's buffer, and evaluation goes through toolbox.evaluateBatch.
+    The elites are the hofSize best rows of the current population, which always include the elites
+    of the previous generation, so the best individual is never lost.
+    Set batchVariation to True to vary all the selected rows with one call to toolbox.mateBatch (two arrays
+    of parents, returning two arrays of children) and one call to toolbox.mutateBatch (an array of boards,
+    returning the mutated array) per generation, see the operators module.
+    stop and telemetry work as in eaSimpleWithElitism().
+    """
+    logbook = tools.Logbook()
+    logbook.header = ['gen', 'nevals'] + (stats.fields if stats else [])
+
+    # Evaluate the individuals with an invalid fitness
+    nevals = store.evaluate(toolbox.evaluateBatch)
+
+    record = stats.compile(store.individuals()) if stats else {}
+    logbook.record(gen=0, nevals=nevals, **record)
+    if telemetry is not None:
+        telemetry.emit(logbook[-1])
+    if verbose:
+        print(logbook.stream)
+
+    numOffspring = len(store) - hofSize
+    stopper = stopping.Stopper(stop)
+    reason = stopper.check(0, np.min(store.fitness), nevals)
+
+    # Begin the generational process
+    for gen in range(1, ngen + 1):
+        if reason is not None:
+            break
+
+        # Select the next generation individuals, and add the best back to population:
+        selected = toolbox.selectIndices(store.fitness, numOffspring)
+        store.replace(np.concatenate([selected, store.best(hofSize)]))
+
+        # Vary the selected rows in place, the elites at the end of the buffer are left untouched:
+        genomes = store.genomes
+        changed = np.zeros(len(store), dtype=bool)
+        if batchVariation:
+            mated = np.array([random.random() < cxpb for _ in range(numOffspring // 2)], dtype=bool)
+            first = np.flatnonzero(mated) * 2
+            if len(first):
+                genomes[first], genomes[first + 1] = toolbox.mateBatch(genomes[first], genomes[first + 1])
+                changed[first] = changed[first + 1] = True
+
+            mutants = np.flatnonzero([random.random() < mutpb for _ in range(numOffspring)])
+            if len(mutants):
+                genomes[mutants] = toolbox.mutateBatch(genomes[mutants])
+                changed[mutants] = True
+        else:
+            for i in range(1, numOffspring, 2):
+                if random.random() < cxpb:
+                    toolbox.mate(genomes[i - 1], genomes[i])
+                    changed[i - 1] = changed[i] = True
+
+            for i in range(numOffspring):
+                if random.random() < mutpb:
+                    toolbox.mutate(genomes[i])
+                    changed[i] = True
+
+        store.invalidate(changed)
+
+        # Evaluate the individuals with an invalid fitness
+        nevals = store.evaluate(toolbox.evaluateBatch)
+
+        # Append the current generation statistics to the logbook
+        record = stats.compile(store.individuals()) if stats else {}
+        logbook.record(gen=gen, nevals=nevals, **record)
+        if telemetry is not None:
+            telemetry.emit(logbook[-1])
+        if verbose:
+            print(logbook.stream)
+
+        reason = stopper.check(gen, np.min(store.fitness), nevals)
+
+    if reason is not None:
+        logbook[-1]['stop'] = reason
+        if verbose:
+            print("Stopped at generation %d: %s" % (logbook[-1]['gen'], reason))
+
+    return store, logbook
@@ -1,9 +1,13 @@
 import random
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib as mpl
 import time
 
+from queens import BoardEvaluator, countDiagonalViolations
+import checkpoint
+import diversity
+import profiling
+import stopping
+
 class NQueensProblem:
     def __init__(self, numOfQueens):
         self.numOfQueens = numOfQueens
@@ -13,21 +17,15 @@ class NQueensProblem:
         if len(positions) != self.numOfQueens:
             raise ValueError("El tamaño de la lista debe ser igual a ", self.numOfQueens)
 
-        violations = 0
-        for i in range(len(positions)):
-            for j in range(i + 1, len(positions)):
-                # i, j son las columnas. positions[i], positions[j] son las filas.
-                column1 = i
-                row1 = positions[i]
-                column2 = j
-                row2 = positions[j]
-
-                if abs(column1 - column2) == abs(row1 - row2):
-                    violations += 1
-        return violations
+        # Conteo O(N) por diagonales (mismo resultado que revisar cada par de reinas)
+        return countDiagonalViolations(positions)
 
     def plotBoard(self, positions):
-        """Dibuja el tablero usando el estilo y la imagen original."""
+        """Dibuja el tablero usando el estilo y la imagen original.
+        matplotlib se importa solo aquí, para no cargarlo en corridas sin gráficas."""
+        import matplotlib.pyplot as plt
+        import matplotlib as mpl
+
         if len(positions) != self.numOfQueens:
             raise ValueError("El tamaño de la lista debe ser igual a ", self.numOfQueens)
 
@@ -64,6 +62,17 @@ class NQueensProblem:
         plt.title(f"Solución Firefly: {self.getViolationsCount(positions)} Violaciones")
         return plt
 
+def hamming_matrix(population):
+    """Matriz (P x P) de distancias de Hamming entre todas las luciérnagas.
+    Se recorre columna por columna (N pasadas de P x P), sin crear el arreglo P x P x N."""
+    boards = np.asarray(population)
+    columns = np.ascontiguousarray(boards.T, dtype=np.int16 if boards.shape[1] < 1 << 15 else np.int32)
+    n_queens, pop_size = columns.shape
+    matches = np.zeros((pop_size, pop_size), dtype=np.uint16 if n_queens < 1 << 16 else np.uint32)
+    for column in columns:
+        matches += np.equal.outer(column, column)
+    return n_queens - matches.astype(np.int32)
+
 class FireflyAlgorithm:
     def __init__(self, n_queens, pop_size, gamma=1.0):
         self.n_queens = n_queens
@@ -71,6 +80,12 @@ class FireflyAlgorithm:
         self.gamma = gamma   # Coeficiente de absorción de luz
         self.population = []
         self.fitnesses = []
+        self.boards = []     # Contadores de diagonales de cada luciérnaga (evaluación incremental)
+        self.evaluations = 0     # Tableros evaluados (completos o con deltas de swaps)
+        self.stop_reason = None
+        self.stop_generation = None
+        self.timings = []    # Segundos por fase de cada generación (solo con profiler)
+        self.diversity = []  # Diversidad de la población en cada generación (solo con track_diversity)
         self.problem = NQueensProblem(n_queens)
 
     def init_population(self):
@@ -78,51 +93,145 @@ class FireflyAlgorithm:
         self.fitnesses = [float('inf')] * self.pop_size
 
     def evaluate_all(self):
+        # Cada tablero se evalúa completo una sola vez; después solo se actualiza con deltas de swaps
+        self.boards = [BoardEvaluator(self.population[i]) for i in range(self.pop_size)]
         for i in range(self.pop_size):
-            self.fitnesses[i] = self.problem.getViolationsCount(self.population[i])
+            self.fitnesses[i] = self.boards[i].violations
+        self.evaluations += self.pop_size
 
-    def move_firefly(self, source_idx, target_idx):
-        """Mueve una solución hacia otra mejor intercambiando posiciones."""
+    def move_firefly(self, source_idx, target_idx, dist=None):
+        """Mueve una solución hacia otra mejor intercambiando posiciones.
+        Los swaps se aplican sobre el evaluador de la luciérnaga, que actualiza su fitness en O(1).
+        Si ya se conoce la distancia de Hamming entre ambas (dist) no se vuelve a calcular."""
         source = self.population[source_idx]
         target = self.population[target_idx]
-        new_pos = list(source)
+        board = self.boards[source_idx]
         
         # Distancia de Hamming (cuántas reinas están en diferente lugar)
-        diff_indices = [k for k in range(self.n_queens) if source[k] != target[k]]
-        dist = len(diff_indices)
+        if dist is None:
+            diff_indices = [k for k in range(self.n_queens) if source[k] != target[k]]
+            dist = len(diff_indices)
         
         if dist > 0:
             # Movimiento discreto: hacer swaps proporcionales a la distancia
             num_swaps = int(dist * 0.2) + 1 
             for _ in range(num_swaps):
                 idx1, idx2 = random.sample(range(self.n_queens), 2)
-                new_pos[idx1], new_pos[idx2] = new_pos[idx2], new_pos[idx1]
-                
-        return new_pos
+                board.applySwap(idx1, idx2)
+            board.commit()
 
-    def run(self, max_generations):
-        self.init_population()
-        self.evaluate_all()
-        
-        history = []
-        best_overall_fitness = float('inf')
-        best_solution = None
+        self.evaluations += 1
+        return board.positions
+
+    def step_vectorized(self, rng, profiler=profiling.NULL_TIMER):
+        """Una generación completa con operaciones matriciales.
+        Las distancias de Hamming, la máscara de brillo (j mejor que i) y la matriz beta se calculan
+        para todos los pares a la vez con el estado al inicio de la generación (actualización síncrona);
+        después solo se aplican los movimientos aceptados."""
+        fitnesses = np.asarray(self.fitnesses)
+        brighter = fitnesses[np.newaxis, :] < fitnesses[:, np.newaxis]   # brighter[i, j]: J es mejor que I
+
+        dist = hamming_matrix(self.population)
+
+        # La distancia es un entero entre 0 y N: beta se toma de una tabla en lugar de llamar a exp() por par
+        beta_table = 1.0 * np.exp(-self.gamma * (np.arange(self.n_queens + 1, dtype=np.float64) ** 2))
+        accepted = brighter & (rng.random(dist.shape) < beta_table[dist])
+        profiler.lap('distance')
+
+        # Aplicar solo los movimientos seleccionados (en el mismo orden que el doble ciclo original)
+        for i, j in zip(*np.nonzero(accepted)):
+            self.population[i] = self.move_firefly(i, j, int(dist[i, j]))
+            self.fitnesses[i] = self.boards[i].violations
+        profiler.lap('moves')
+
+    def run(self, max_generations, vectorized=False, stop=None, profiler=None, checkpointer=None, resume=None,
+            telemetry=None, local_search=None, track_diversity=False):
+        """Ejecuta el algoritmo. Con vectorized=True cada generación usa step_vectorized(),
+        pensado para poblaciones grandes (cientos o miles de luciérnagas).
+        stop es una lista de criterios de paro (módulo stopping); por defecto se detiene al encontrar
+        un tablero sin violaciones. El motivo y la generación quedan en stop_reason / stop_generation.
+        Con un profiling.PhaseTimer en profiler, el tiempo de cada generación se divide en 'distance'
+        (distancias y atracción), 'moves' (swaps con su evaluación incremental), 'localsearch' (si hay
+        local_search) y 'evaluation' (búsqueda del mejor y criterios de paro); queda en self.timings, una
+        entrada por generación. Sin vectorized, distancias y movimientos se intercalan par por par y todo
+        el doble ciclo queda en 'moves'.
+        Con un checkpoint.Checkpointer se guarda el estado completo (población, historial, criterios de paro
+        y generadores aleatorios) cada checkpointer.interval generaciones; para continuar una corrida se
+        pasa en resume el estado leído con checkpoint.load() y se obtiene el mismo resultado que sin la
+        interrupción.
+        Con un telemetry.TelemetrySink se emite un registro por generación (gen, min, avg, nevals) sin
+        detener el ciclo.
+        local_search es una etapa memética opcional (localsearch.MinConflictsRefinement): después de los
+        movimientos refina las mejores luciérnagas con búsqueda tabú de mínimos conflictos; sus evaluaciones
+        se suman a self.evaluations para que la comparación con el algoritmo simple sea justa.
+        Con track_diversity=True se guarda en self.diversity la diversidad de cada generación (distancia de
+        Hamming media, entropía por columna y tableros únicos, ver módulo diversity), calculada por
+        frecuencias de columna en O(P·N) y no comparando todos los pares; también se emite en telemetry."""
+        profiler = profiler or profiling.NULL_TIMER
+        if stop is None:
+            stop = [stopping.TargetFitness(0)]
+        self.evaluations = 0
+        self.stop_reason = None
+        self.stop_generation = None
+        self.timings = []
+        self.diversity = []
+
+        if resume is None:
+            self.init_population()
+            self.evaluate_all()
+            stopper = stopping.Stopper(stop)
+            rng = np.random.default_rng(random.getrandbits(64)) if vectorized else None
+
+            history = []
+            best_overall_fitness = float('inf')
+            best_solution = None
+            start = 0
+        else:
+            # Los contadores de diagonales no se guardan: se reconstruyen a partir de los tableros
+            self.boards = [BoardEvaluator(positions) for positions in resume['population']]
+            self.population = [board.positions for board in self.boards]
+            self.fitnesses = resume['fitnesses']
+            self.evaluations = resume['evaluations']
+            stopper = resume['stopper']
+            rng = None
+            if resume['bit_generator'] is not None:
+                rng = np.random.default_rng()
+                rng.bit_generator.state = resume['bit_generator']
+            checkpoint.setRngState(resume['rng'])
+
+            history = resume['history']
+            best_overall_fitness = resume['best_fitness']
+            best_solution = resume['best_solution']
+            start = resume['generation'] + 1
 
         print(f"Ejecutando Firefly ({self.n_queens} Reinas)...")
 
-        for t in range(max_generations):
-            for i in range(self.pop_size):
-                for j in range(self.pop_size):
+        for t in range(start, max_generations):
+            profiler.start()
+            if vectorized:
+                self.step_vectorized(rng, profiler)
+            else:
+                for i in range(self.pop_size):
+                    for j in range(self.pop_size):
                     
-                    # Si la luciérnaga J es mejor que I, I se mueve hacia J
-                    if self.fitnesses[j] < self.fitnesses[i]:
+                        # Si la luciérnaga J es mejor que I, I se mueve hacia J
+                        if self.fitnesses[j] < self.fitnesses[i]:
                         
-                        dist = np.sum([1 for k in range(self.n_queens) if self.population[i][k] != self.population[j][k]])
-                        beta = 1.0 * np.exp(-self.gamma * (dist ** 2))
+                            dist = np.sum([1 for k in range(self.n_queens) if self.population[i][k] != self.population[j][k]])
+                            beta = 1.0 * np.exp(-self.gamma * (dist ** 2))
                         
-                        if random.random() < beta:
-                            self.population[i] = self.move_firefly(i, j)
-                            self.fitnesses[i] = self.problem.getViolationsCount(self.population[i])
+                            if random.random() < beta:
+                                self.population[i] = self.move_firefly(i, j)
+                                self.fitnesses[i] = self.boards[i].violations
+                # En el doble ciclo cada distancia usa los tableros ya movidos, así que no se puede separar
+                # de los movimientos sin medir cada par: todo el ciclo se cuenta como 'moves'
+                profiler.lap('moves')
+
+            # Etapa memética: los tableros se refinan en su lugar (las posiciones son las mismas listas)
+            if local_search is not None:
+                self.evaluations += local_search.refineBoards(self.boards)
+                self.fitnesses = [board.violations for board in self.boards]
+                profiler.lap('localsearch')
 
             current_best = min(self.fitnesses)
             history.append(current_best)
@@ -132,10 +241,33 @@ class FireflyAlgorithm:
                 best_overall_fitness = current_best
                 best_idx = self.fitnesses.index(current_best)
                 best_solution = list(self.population[best_idx])
-                
-                # Si encontramos la solución perfecta, terminamos antes (Opcional)
-                if best_overall_fitness == 0:
-                    break
+
+            # Criterios de paro (por defecto: solución perfecta encontrada)
+            record = {}
+            if track_diversity:
+                record = diversity.diversity(self.population)
+                self.diversity.append(record)
+            if telemetry is not None:
+                telemetry.emit({'gen': t, 'min': current_best, 'avg': sum(self.fitnesses) / self.pop_size,
+                                'nevals': self.evaluations - stopper.nevals, **record})
+            reason = stopper.check(t, best_overall_fitness, self.evaluations - stopper.nevals)
+            profiler.lap('evaluation')
+            if profiler:
+                self.timings.append(profiler.end())
+            if reason is not None:
+                self.stop_reason = reason
+                self.stop_generation = t
+                break
+
+            if checkpointer is not None and checkpointer.due(t + 1):
+                checkpointer.save(dict(generation=t, population=self.population, fitnesses=self.fitnesses,
+                                       evaluations=self.evaluations, stopper=stopper,
+                                       bit_generator=rng.bit_generator.state if rng is not None else None,
+                                       rng=checkpoint.rngState(), history=history,
+                                       best_fitness=best_overall_fitness, best_solution=best_solution))
+
+        if checkpointer is not None:
+            checkpointer.wait()
 
         return best_overall_fitness, best_solution, history, self.problem
 
@@ -145,13 +277,14 @@ if __name__ == "__main__":
     N_QUEENS = 16       # Puedes cambiar a 16
     POPULATION = 50       
     GENERATIONS = 50      
+    VECTORIZADO = False   # True: generación matricial, para poblaciones de cientos/miles de luciérnagas
     
     # Iniciar Solver
     solver = FireflyAlgorithm(N_QUEENS, POPULATION)
     
     # Medir tiempo
     start_time = time.perf_counter()
-    best_score, best_board, curve, problem_instance = solver.run(GENERATIONS)
+    best_score, best_board, curve, problem_instance = solver.run(GENERATIONS, vectorized=VECTORIZADO)
     end_time = time.perf_counter()
     
     # Imprimir
@@ -0,0 +1,73 @@
+import array
+import hashlib
+from collections import OrderedDict
+
+
+class FitnessCache:
+    """Bounded LRU cache of fitness values, keyed by a compact hash of the board permutation.
+    Used by elitism.evaluateInvalid() to skip the evaluation of boards that were already seen:
+    hall-of-fame clones, offspring left unchanged by crossover and mutation, converged duplicates.
+    """
+
+    def __init__(self, maxsize=100000, digestSize=16):
+        """
+        :param maxsize: the maximal number of boards kept, the least recently used ones are evicted first
+        :param digestSize: the size in bytes of the hash used as key
+        """
+        if maxsize <= 0:
+            raise ValueError("maxsize should be a positive number, got ", maxsize)
+
+        self.maxsize = maxsize
+        self.digestSize = digestSize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        """
+        :return: the number of boards currently cached
+        """
+        return len(self.entries)
+
+    def key(self, individual):
+        """
+        :param individual: an array('i') individual, or any other int32 buffer
+        :return: the cache key of the board
+        """
+        try:
+            return hashlib.blake2b(individual, digest_size=self.digestSize).digest()
+        except TypeError:
+            # not a buffer (e.g. a plain list), hash it with the same layout as array('i'):
+            return hashlib.blake2b(array.array('i', individual), digest_size=self.digestSize).digest()
+
+    def get(self, key):
+        """
+        :param key: a key returned by key()
+        :return: the cached fitness values, or None if the board is not cached
+        """
+        fitness = self.entries.get(key)
+        if fitness is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return fitness
+
+    def put(self, key, fitness):
+        """
+        Stores the fitness values of a board, evicting the least recently used board if the cache is full
+        :param key: a key returned by key()
+        :param fitness: the fitness values tuple
+        """
+        self.entries[key] = fitness
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def counters(self):
+        """
+        :return: the running hits, misses and evictions counts, as used in the logbook
+        """
+        return {"cache_hits": self.hits, "cache_misses": self.misses, "cache_evictions": self.evictions}
@@ -0,0 +1,227 @@
+import multiprocessing
+import queue
+import random
+
+import numpy as np
+from deap import base
+from deap import creator
+from deap import tools
+
+import elitism
+import n_queens
+import queens
+import stopping
+
+# problem constants:
+NUM_OF_QUEENS = 64
+
+# Island model constants:
+NUM_OF_ISLANDS = 4
+POPULATION_SIZE = 200  # per island
+MAX_GENERATIONS = 500
+HALL_OF_FAME_SIZE = 10
+MIGRATION_INTERVAL = 10  # generations between two migrations
+MIGRATION_SIZE = 5  # number of individuals sent to every neighbour
+TOPOLOGY = "ring"  # "ring" or "full"
+P_CROSSOVER = 0.9  # probability for crossover
+P_MUTATION = 0.1   # probability for mutating an individual
+RANDOM_SEED = 42
+
+
+def createToolbox(numOfQueens):
+    """
+    Creates the toolbox of the n_queens Genetic Algorithm for any number of queens,
+    using the creator classes and the operators defined by n_queens
+    :param numOfQueens: the number of queens in the problem
+    :return: the toolbox
+    """
+    nQueens = queens.NQueensProblem(numOfQueens)
+    toolbox = base.Toolbox()
+
+    toolbox.register("randomOrder", random.sample, range(numOfQueens), numOfQueens)
+    toolbox.register("individualCreator", tools.initIterate, creator.Individual, toolbox.randomOrder)
+    toolbox.register("populationCreator", tools.initRepeat, list, toolbox.individualCreator)
+
+    toolbox.register("evaluate", lambda individual: (nQueens.getViolationsCount(individual),))
+    toolbox.register("evaluateBatch", nQueens.getViolationsCountBatch)
+
+    toolbox.register("select", tools.selTournament, tournsize=2)
+    toolbox.register("mate", tools.cxUniformPartialyMatched, indpb=2.0/numOfQueens)
+    toolbox.register("mutate", tools.mutShuffleIndexes, indpb=1.0/numOfQueens)
+
+    return toolbox
+
+
+def neighbours(islandId, numIslands, topology):
+    """
+    :param islandId: the index of the island
+    :param numIslands: the number of islands
+    :param topology: "ring" (send to the next island) or "full" (send to all the other islands)
+    :return: the indices of the islands that receive the migrants of the given island
+    """
+    if numIslands == 1:
+        return []
+    if topology == "ring":
+        return [(islandId + 1) % numIslands]
+    if topology == "full":
+        return [other for other in range(numIslands) if other != islandId]
+    raise ValueError("unknown topology: ", topology)
+
+
+def _runIsland(islandId, config, inboxes, stopEvent, barrier, results):
+    # evolves one island in epochs of MIGRATION_INTERVAL generations, exchanging migrants in between.
+    random.seed(config["seed"] + islandId)
+    toolbox = createToolbox(config["numOfQueens"])
+
+    stats = tools.Statistics(lambda ind: ind.fitness.values)
+    stats.register("min", np.min)
+    stats.register("avg", np.mean)
+
+    population = toolbox.populationCreator(n=config["populationSize"])
+    hof = tools.HallOfFame(config["hallOfFameSize"])
+    logbook = tools.Logbook()
+    stopper = stopping.Stopper(config["stop"])
+    targets = neighbours(islandId, config["numIslands"], config["topology"])
+    numIncoming = sum(islandId in neighbours(other, config["numIslands"], config["topology"])
+                      for other in range(config["numIslands"]))
+
+    gen = 0
+    reason = None
+    while True:
+        epoch = min(config["migrationInterval"], config["ngen"] - gen)
+        population, epochLog = elitism.eaSimpleWithElitism(population, toolbox, config["cxpb"], config["mutpb"],
+                                                           epoch, stats=stats, halloffame=hof, verbose=False,
+                                                           batchEvaluate=config["batchEvaluate"])
+
+        # append the epoch to the island's logbook, the generation 0 record is only kept for the first epoch:
+        for record in epochLog[(1 if gen > 0 else 0):]:
+            logbook.record(**dict(record, gen=record["gen"] + gen, island=islandId))
+        gen += epoch
+
+        reason = stopper.check(gen, hof[0].fitness.values[0], sum(epochLog.select("nevals")))
+        if reason is not None or gen >= config["ngen"]:
+            stopEvent.set()
+
+        # send copies of the best individuals to the neighbours, as plain lists of positions:
+        emigrants = [(list(ind), ind.fitness.values) for ind in tools.selBest(population, config["migrationSize"])]
+        for target in targets:
+            inboxes[target].put(emigrants)
+
+        # the immigrants replace the worst individuals:
+        immigrants = []
+        for _ in range(numIncoming):
+            immigrants.extend(inboxes[islandId].get())
+        immigrants = immigrants[:len(population) - len(hof)]
+        worst = set(map(id, tools.selWorst(population, len(immigrants))))
+        population[:] = [ind for ind in population if id(ind) not in worst]
+        for positions, fitness in immigrants:
+            ind = creator.Individual(positions)
+            ind.fitness.values = fitness
+            population.append(ind)
+
+        # every island has decided whether to stop before any of them reads the decision, and every island has
+        # read it before any of them can set it again in the next epoch, so they all stop in the same epoch:
+        barrier.wait()
+        stopNow = stopEvent.is_set()
+        barrier.wait()
+        if stopNow:
+            break
+
+    if reason is not None:
+        logbook[-1]["stop"] = reason
+
+    results.put((islandId, [(list(ind), ind.fitness.values) for ind in hof.items], list(logbook)))
+
+
+def _collectResults(results, processes, timeout=1.0):
+    """
+    Waits for the result of every island, checking every timeout seconds that none of the processes died
+    :return: the (islandId, best individuals, logbook records) tuples, in arrival order
+    """
+    islandResults = []
+    while len(islandResults) < len(processes):
+        try:
+            islandResults.append(results.get(timeout=timeout))
+        except queue.Empty:
+            # an island that exits normally has put its result first, so only a failure exit code is fatal:
+            for islandId, process in enumerate(processes):
+                if process.exitcode not in (None, 0):
+                    raise RuntimeError("island %d exited with code %d before sending its result"
+                                       % (islandId, process.exitcode)) from None
+    return islandResults
+
+
+def runIslands(numOfQueens, numIslands, populationSize, ngen, migrationInterval=10, migrationSize=5,
+               topology="ring", hallOfFameSize=10, cxpb=0.9, mutpb=0.1, seed=42, stop=None, batchEvaluate=True):
+    """
+    Runs the n_queens Genetic Algorithm as an island model: every island evolves its own population in a
+    separate process with elitism.eaSimpleWithElitism(), and every migrationInterval generations the
+    islands send copies of their migrationSize best individuals to their neighbours (see neighbours()),
+    where they replace the worst individuals.
+    The stopping criteria are checked by every island at the migration points; as soon as one island
+    stops, all of them stop after the current exchange.
+    If an island process dies before sending its result, the other islands are terminated and a
+    RuntimeError is raised.
+    :return: the best individuals found (best first, as (positions, fitness values) tuples),
+    the merged logbook with an 'island' column, and the logbook of every island
+    """
+    config = dict(numOfQueens=numOfQueens, numIslands=numIslands, populationSize=populationSize, ngen=ngen,
+                  migrationInterval=migrationInterval, migrationSize=migrationSize, topology=topology,
+                  hallOfFameSize=hallOfFameSize, cxpb=cxpb, mutpb=mutpb, seed=seed, stop=stop,
+                  batchEvaluate=batchEvaluate)
+    neighbours(0, numIslands, topology)  # validate the topology before starting the processes
+
+    inboxes = [multiprocessing.Queue() for _ in range(numIslands)]
+    stopEvent = multiprocessing.Event()
+    barrier = multiprocessing.Barrier(numIslands)
+    results = multiprocessing.Queue()
+
+    processes = [multiprocessing.Process(target=_runIsland, args=(i, config, inboxes, stopEvent, barrier, results))
+                 for i in range(numIslands)]
+    for process in processes:
+        process.start()
+
+    # collect the results before joining, so the processes are not blocked on a full pipe:
+    try:
+        islandResults = sorted(_collectResults(results, processes))
+    except BaseException:
+        # the other islands would wait forever at the barrier for the one that is gone:
+        for process in processes:
+            process.terminate()
+        raise
+    finally:
+        for process in processes:
+            process.join()
+
+    best = sorted((item for _, items, _ in islandResults for item in items), key=lambda item: item[1])
+    islandLogbooks = []
+    logbook = tools.Logbook()
+    for _, _, records in islandResults:
+        islandLogbook = tools.Logbook()
+        islandLogbook.extend(records)
+        islandLogbooks.append(islandLogbook)
+        logbook.extend(records)
+    logbook.header = ['gen', 'island', 'nevals', 'min', 'avg']
+
+    return best[:hallOfFameSize], logbook, islandLogbooks
+
+
+def main():
+    best, logbook, islandLogbooks = runIslands(NUM_OF_QUEENS, NUM_OF_ISLANDS, POPULATION_SIZE, MAX_GENERATIONS,
+                                               migrationInterval=MIGRATION_INTERVAL, migrationSize=MIGRATION_SIZE,
+                                               topology=TOPOLOGY, hallOfFameSize=HALL_OF_FAME_SIZE,
+                                               cxpb=P_CROSSOVER, mutpb=P_MUTATION, seed=RANDOM_SEED,
+                                               stop=[stopping.TargetFitness(0)])
+
+    for islandId, islandLogbook in enumerate(islandLogbooks):
+        last = islandLogbook[-1]
+        print("island", islandId, ": gen =", last["gen"], " min =", last["min"], " avg =", last["avg"],
+              " stop =", last.get("stop"))
+
+    print("- Best solutions are:")
+    for i, (positions, fitness) in enumerate(best):
+        print(i, ": ", fitness[0], " -> ", positions)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import argparse
+import array
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from queens import BoardEvaluator
+
+# Large-N mode: a board is an array('i') permutation plus two array('i') diagonal occupancy counters,
+# about 20 bytes per queen, and no structure of size N x N is ever created.
+# The solver follows Sosic and Gu's linear-time QS4 heuristic: a greedy random construction that places
+# most queens without any conflict, followed by a repair phase of conflict-reducing random swaps.
+
+DEFAULT_MEMORY_BUDGET_MB = 80  # per million queens, see estimateMemory()
+GREEDY_ATTEMPTS_PER_QUEEN = 3.08  # random draws of the greedy construction, as in Sosic and Gu's QS4
+
+
+def estimateMemory(numOfQueens):
+    """
+    :param numOfQueens: the number of queens
+    :return: an upper bound, in bytes, of the peak memory of solving and verifying a board: two sets of
+    int32 permutation and diagonal counters (20 bytes per queen each) and the temporaries of the vectorized
+    diagonal count, which peaks during the verification (about 63 bytes per queen measured with tracemalloc)
+    """
+    return 72 * numOfQueens
+
+
+def _zeros(size):
+    return array.array('i', bytes(4 * size))
+
+
+def _diagonalCounts(positions):
+    # occupancy of the main (column - row) and anti (column + row) diagonals, counted with bincount:
+    numOfQueens = len(positions)
+    rows = np.frombuffer(positions, dtype=np.int32) if isinstance(positions, array.array) else np.asarray(positions)
+    columns = np.arange(numOfQueens, dtype=np.int32)
+    numDiagonals = 2 * numOfQueens - 1
+    main = np.bincount(columns - rows + numOfQueens - 1, minlength=numDiagonals).astype(np.int32)
+    anti = np.bincount(columns + rows, minlength=numDiagonals).astype(np.int32)
+    return main, anti
+
+
+class CompactBoardEvaluator(BoardEvaluator):
+    """A BoardEvaluator for very large boards: the positions and the diagonal counters are int32 arrays,
+    and the counters are built with a vectorized count instead of adding the queens one by one.
+    """
+
+    def __init__(self, positions):
+        """
+        :param positions: a sequence of indices corresponding to the positions of the queens in each row.
+        It is converted to an array('i') owned by the evaluator.
+        """
+        if not (isinstance(positions, array.array) and positions.typecode == 'i'):
+            positions = array.array('i', positions)
+        self.positions = positions
+        self.offset = len(positions) - 1
+        self.appliedSwaps = []
+
+        main, anti = _diagonalCounts(positions)
+        self.violations = int(sum((counts.astype(np.int64) * (counts - 1) // 2).sum() for counts in (main, anti)))
+        self.mainDiagonals = array.array('i', main.tobytes())
+        self.antiDiagonals = array.array('i', anti.tobytes())
+
+    def conflictedRows(self):
+        """
+        :return: an int array with the rows whose queen is attacked, found with a vectorized pass
+        """
+        rows = np.frombuffer(self.positions, dtype=np.int32)
+        columns = np.arange(len(rows))
+        main = np.frombuffer(self.mainDiagonals, dtype=np.int32)[columns - rows + self.offset]
+        anti = np.frombuffer(self.antiDiagonals, dtype=np.int32)[columns + rows]
+        return np.flatnonzero(main + anti > 2)
+
+
+def greedyPermutation(numOfQueens, rng=random, attemptsPerQueen=GREEDY_ATTEMPTS_PER_QUEEN):
+    """
+    The construction phase of QS4: the rows are filled in order, each with a random remaining position
+    that no queen placed so far attacks; once the attempts are used up, the remaining rows keep the
+    positions left for them.
+    :return: the array('i') permutation, and the number of rows placed without conflict
+    """
+    positions = array.array('i', range(numOfQueens))
+    offset = numOfQueens - 1
+    mainDiagonals = _zeros(2 * numOfQueens - 1)
+    antiDiagonals = _zeros(2 * numOfQueens - 1)
+    randrange = rng.randrange
+
+    placed = 0
+    for _ in range(int(attemptsPerQueen * numOfQueens)):
+        if placed == numOfQueens:
+            break
+        candidate = randrange(placed, numOfQueens)
+        row = positions[candidate]
+        if mainDiagonals[placed - row + offset] == 0 and antiDiagonals[placed + row] == 0:
+            positions[candidate] = positions[placed]
+            positions[placed] = row
+            mainDiagonals[placed - row + offset] = 1
+            antiDiagonals[placed + row] = 1
+            placed += 1
+
+    return positions, placed
+
+
+def repairConflicts(board, maxSteps, rng=random):
+    """
+    The repair phase of QS4: every attacked queen is swapped with random rows until a swap lowers the
+    number of violations, until the board is solved or maxSteps swaps were tried.
+    :param board: a CompactBoardEvaluator, modified in place
+    :return: the number of swaps tried
+    """
+    numOfQueens = len(board)
+    randrange = rng.randrange
+    steps = 0
+    while board.violations > 0 and steps < maxSteps:
+        for i in board.conflictedRows().tolist():
+            while board.getConflicts(i) > 0 and steps < maxSteps:
+                j = randrange(numOfQueens)
+                steps += 1
+                if board.swapDelta(i, j) < 0:
+                    board.applySwap(i, j)
+                    board.commit()
+    return steps
+
+
+def solveLarge(numOfQueens, seed=None, maxSteps=None):
+    """
+    Solves a large N-Queens instance in linear memory
+    :param numOfQueens: the number of queens
+    :param seed: the seed of the random generator
+    :param maxSteps: the maximal number of repair swaps, 100 * N by default
+    :return: the CompactBoardEvaluator of the final board, and a dictionary with the number of rows placed
+    by the greedy phase, the repair swaps tried and the seconds spent in every phase
+    """
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    positions, placed = greedyPermutation(numOfQueens, rng)
+    greedyTime = time.perf_counter() - start
+
+    start = time.perf_counter()
+    board = CompactBoardEvaluator(positions)
+    steps = repairConflicts(board, maxSteps if maxSteps is not None else 100 * numOfQueens, rng)
+    repairTime = time.perf_counter() - start
+
+    return board, {"placed": placed, "repair_steps": steps, "greedy_time": greedyTime, "repair_time": repairTime}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve a large N-Queens instance within a memory budget")
+    parser.add_argument("--n", type=int, default=1000000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--budget-mb", type=float,
+                        help="memory budget in MB, %d MB per million queens by default" % DEFAULT_MEMORY_BUDGET_MB)
+    parser.add_argument("--measure", action="store_true", help="measure the peak memory with tracemalloc (slower)")
+    args = parser.parse_args(argv)
+
+    budget = (args.budget_mb if args.budget_mb is not None else
+              max(1.0, DEFAULT_MEMORY_BUDGET_MB * args.n / 1e6)) * 2 ** 20
+    estimate = estimateMemory(args.n)
+    print("N = %d, estimated memory %.1f MB, budget %.1f MB" % (args.n, estimate / 2 ** 20, budget / 2 ** 20))
+    if estimate > budget:
+        print("The estimated memory exceeds the budget")
+        return 1
+
+    if args.measure:
+        tracemalloc.start()
+    board, info = solveLarge(args.n, args.seed)
+
+    # verify the final board with counters rebuilt from scratch, independently of the incremental updates:
+    verified = CompactBoardEvaluator(array.array('i', board.positions)).violations
+    peak = None
+    if args.measure:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    print("greedy phase placed %d rows in %.2fs, repair phase tried %d swaps in %.2fs" %
+          (info["placed"], info["greedy_time"], info["repair_steps"], info["repair_time"]))
+    print("violations = %d (verified %d)" % (board.violations, verified))
+    if peak is not None:
+        print("peak traced memory %.1f MB" % (peak / 2 ** 20))
+        if peak > budget:
+            print("The peak memory exceeds the budget")
+            return 1
+    return 0 if verified == board.violations == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+import random
+
+from queens import BoardEvaluator
+
+
+def minConflicts(board, maxSteps, tabuTenure=None, rng=random):
+    """
+    Conflict-directed tabu search on a single board: every step picks a random attacked queen and swaps it
+    with the row that gives the lowest number of violations, scoring all the candidate swaps in O(1) each
+    with the board's diagonal counters. The rows of a swap are tabu for tabuTenure steps, unless moving
+    them again reaches a new best board, so the search can climb out of plateaus and local minima.
+    The board is left at the best state found.
+    :param board: a queens.BoardEvaluator, modified in place
+    :param maxSteps: the maximal number of swaps
+    :param tabuTenure: the number of steps a swapped row is tabu, N / 10 by default
+    :param rng: the random generator used to break ties
+    :return: the number of candidate boards evaluated (one per swap scored)
+    """
+    n = len(board)
+    if tabuTenure is None:
+        tabuTenure = max(1, n // 10)
+    tabuUntil = [0] * n
+    bestViolations = board.violations
+    nevals = 0
+
+    board.commit()
+    for step in range(maxSteps):
+        if board.violations == 0:
+            break
+
+        attacked = [i for i in range(n) if board.getConflicts(i) > 0]
+        i = rng.choice(attacked)
+
+        bestDelta = None
+        candidates = []
+        for j in range(n):
+            if j == i:
+                continue
+            delta = board.swapDelta(i, j)
+            nevals += 1
+            if tabuUntil[j] > step and board.violations + delta >= bestViolations:
+                continue
+            if bestDelta is None or delta < bestDelta:
+                bestDelta = delta
+                candidates = [j]
+            elif delta == bestDelta:
+                candidates.append(j)
+
+        if not candidates:
+            continue
+        j = rng.choice(candidates)
+        board.applySwap(i, j)
+        tabuUntil[i] = tabuUntil[j] = step + 1 + tabuTenure
+
+        if board.violations < bestViolations:
+            bestViolations = board.violations
+            board.commit()
+
+    # return to the best board found, the swaps made after it are still undoable:
+    while board.appliedSwaps:
+        board.undoSwap()
+
+    return nevals
+
+
+class MinConflictsRefinement:
+    """The memetic refinement stage: a bounded minConflicts() search applied to the best individuals
+    of every generation. Pass an instance as localSearch to elitism.eaSimpleWithElitism(), or as
+    local_search to FireflyAlgorithm.run().
+    """
+
+    def __init__(self, topK=1, maxSteps=50, tabuTenure=None):
+        """
+        :param topK: the number of best (distinct) individuals refined in every generation
+        :param maxSteps: the maximal number of swaps of every search
+        :param tabuTenure: see minConflicts()
+        """
+        self.topK = topK
+        self.maxSteps = maxSteps
+        self.tabuTenure = tabuTenure
+
+    def _best(self, items, violations):
+        # the indices of the topK best distinct boards:
+        chosen, seen = [], set()
+        for index in sorted(range(len(items)), key=violations):
+            key = tuple(items[index])
+            if key not in seen:
+                seen.add(key)
+                chosen.append(index)
+                if len(chosen) == self.topK:
+                    break
+        return chosen
+
+    def __call__(self, individuals, clone):
+        """
+        Refines the best individuals of a list with valid fitness values (number of violations).
+        An individual that is improved is replaced in the list by a refined clone, so individuals
+        shared with the hall of fame or other generations are never modified.
+        :param individuals: the list of individuals
+        :param clone: the function that copies an individual, usually toolbox.clone
+        :return: the number of evaluations spent
+        """
+        nevals = 0
+        for index in self._best(individuals, lambda i: individuals[i].fitness.values[0]):
+            individual = clone(individuals[index])
+            board = BoardEvaluator(individual)
+            nevals += minConflicts(board, self.maxSteps, self.tabuTenure)
+            if board.violations < individual.fitness.values[0]:
+                individual.fitness.values = board.violations,
+                individuals[index] = individual
+        return nevals
+
+    def refineBoards(self, boards):
+        """
+        Refines the best of a list of queens.BoardEvaluator objects in place
+        :return: the number of evaluations spent
+        """
+        nevals = 0
+        for index in self._best([board.positions for board in boards], lambda i: boards[i].violations):
+            nevals += minConflicts(boards[index], self.maxSteps, self.tabuTenure)
+        return nevals
@@ -4,12 +4,21 @@ from deap import tools
 
 import random
 import array
+import os
 
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 
+import checkpoint
+import diversity
 import elitism
+import operators
+import fitness_cache
+import localsearch
+import parallel
+import population as populationStore
+import profiling
+import stopping
+import telemetry
 import queens as queens
 
 # problem constants:
@@ -21,6 +30,23 @@ MAX_GENERATIONS = 60
 HALL_OF_FAME_SIZE = 30
 P_CROSSOVER = 0.9  # probability for crossover
 P_MUTATION = 0.1   # probability for mutating an individual
+BATCH_EVALUATION = False  # evaluate every generation as one (pop_size x N) array - pays off at large pop sizes
+PARALLEL_EVALUATION = False  # evaluate the batches on a pool of worker processes (implies BATCH_EVALUATION)
+NUM_OF_WORKERS = None  # number of worker processes, None for all the cores
+FITNESS_CACHE_SIZE = 0  # number of boards kept in the fitness cache, 0 to disable it
+COPY_FREE_ELITISM = False  # keep the elites by reference and only clone the individuals that are changed
+COMPACT_POPULATION = False  # keep the population in one (pop_size x N) int32 buffer - for very large pop sizes
+BATCH_VARIATION = False  # with COMPACT_POPULATION, apply crossover and mutation to all the selected rows at once
+STOP_AT_SOLUTION = True  # end the run as soon as a board with zero violations is found
+MAX_STALL_GENERATIONS = None  # end the run after this many generations without improvement, None to disable
+CHECKPOINT_PATH = None  # save the run state to this file, and resume from it if it exists, None to disable
+CHECKPOINT_INTERVAL = 10  # generations between two checkpoints
+TRACK_DIVERSITY = False  # add the population diversity (hamming, entropy, unique) to the statistics
+HEADLESS = False  # no console output per generation and no plots, for batch jobs
+TELEMETRY_PATH = None  # stream every generation to this JSON lines file (see telemetry.py), None to disable
+LOCAL_SEARCH_TOP_K = 0  # refine this many of the best offspring per generation with min-conflicts, 0 to disable
+LOCAL_SEARCH_STEPS = 50  # maximal number of swaps of every min-conflicts search
+PROFILE_PATH = None  # time the phases of every generation and write them to this folded stacks file, None to disable
 RANDOM_SEED = 42
 random.seed(RANDOM_SEED)
 
@@ -52,35 +78,136 @@ def getViolationsCount(individual):
 
 toolbox.register("evaluate", getViolationsCount)
 
+# vectorized fitness calculation of a whole (pop_size x N) array of individuals at once:
+toolbox.register("evaluateBatch", nQueens.getViolationsCountBatch)
+
 
 # Genetic operators:
 toolbox.register("select", tools.selTournament, tournsize=2)
+toolbox.register("selectIndices", populationStore.selTournamentIndices, tournsize=2)
 toolbox.register("mate", tools.cxUniformPartialyMatched, indpb=2.0/len(nQueens))
 toolbox.register("mutate", tools.mutShuffleIndexes, indpb=1.0/len(nQueens))
 
+# Batch versions of the genetic operators, for BATCH_VARIATION:
+toolbox.register("mateBatch", operators.cxPartialyMatchedBatch)
+toolbox.register("mutateBatch", operators.mutSwapBatch)
+
 
 # Genetic Algorithm flow:
 def main():
 
-    # create initial population (generation 0):
-    population = toolbox.populationCreator(n=POPULATION_SIZE)
+    # the compact population flow does not support every option of the list-based flow:
+    if COMPACT_POPULATION:
+        unsupported = [name for name, value in (("FITNESS_CACHE_SIZE", FITNESS_CACHE_SIZE),
+                                                ("COPY_FREE_ELITISM", COPY_FREE_ELITISM),
+                                                ("PROFILE_PATH", PROFILE_PATH),
+                                                ("CHECKPOINT_PATH", CHECKPOINT_PATH),
+                                                ("LOCAL_SEARCH_TOP_K", LOCAL_SEARCH_TOP_K)) if value]
+        if unsupported:
+            raise ValueError("COMPACT_POPULATION does not support " + ", ".join(unsupported))
 
     # prepare the statistics object:
-    stats = tools.Statistics(lambda ind: ind.fitness.values)
+    if TRACK_DIVERSITY:
+        stats = diversity.DiversityStatistics(lambda ind: ind.fitness.values)
+    else:
+        stats = tools.Statistics(lambda ind: ind.fitness.values)
     stats.register("min", np.min)
     stats.register("avg", np.mean)
 
-    # define the hall-of-fame object:
-    hof = tools.HallOfFame(HALL_OF_FAME_SIZE)
-
-    # perform the Genetic Algorithm flow with hof feature added:
-    population, logbook = elitism.eaSimpleWithElitism(population, toolbox, cxpb=P_CROSSOVER, mutpb=P_MUTATION,
-                                              ngen=MAX_GENERATIONS, stats=stats, halloffame=hof, verbose=True)
+    # stopping criteria:
+    stop = []
+    if STOP_AT_SOLUTION:
+        stop.append(stopping.TargetFitness(0))
+    if MAX_STALL_GENERATIONS:
+        stop.append(stopping.NoImprovement(MAX_STALL_GENERATIONS))
+
+    # remember the fitness of the boards already evaluated, if requested:
+    cache = fitness_cache.FitnessCache(FITNESS_CACHE_SIZE) if FITNESS_CACHE_SIZE > 0 else None
+
+    # the memetic refinement stage, if requested:
+    localSearch = None
+    if LOCAL_SEARCH_TOP_K > 0:
+        localSearch = localsearch.MinConflictsRefinement(LOCAL_SEARCH_TOP_K, LOCAL_SEARCH_STEPS)
+
+    # time the phases of every generation, if requested:
+    profiler = profiling.PhaseTimer("n_queens") if PROFILE_PATH else None
+
+    # stream the logbook records to the telemetry file, if requested:
+    sink = telemetry.TelemetrySink(TELEMETRY_PATH) if TELEMETRY_PATH else None
+
+    # use the process pool backend for the batch evaluation, if requested:
+    evaluator = None
+    if PARALLEL_EVALUATION:
+        evaluator = parallel.ParallelEvaluator(NUM_OF_QUEENS, NUM_OF_WORKERS)
+        toolbox.register("evaluateBatch", evaluator)
+
+    try:
+        if COMPACT_POPULATION:
+            # create initial population (generation 0) in a single buffer:
+            store = populationStore.PopulationStore.random(POPULATION_SIZE, NUM_OF_QUEENS)
+
+            # perform the Genetic Algorithm flow with index-based elitism:
+            store, logbook = elitism.eaSimpleWithElitismStore(store, toolbox, cxpb=P_CROSSOVER, mutpb=P_MUTATION,
+                                                              ngen=MAX_GENERATIONS, hofSize=HALL_OF_FAME_SIZE,
+                                                              stats=stats, verbose=not HEADLESS, stop=stop,
+                                                              telemetry=sink, batchVariation=BATCH_VARIATION)
+            bestItems = [store[i] for i in store.best(HALL_OF_FAME_SIZE)]
+        else:
+            # create initial population (generation 0):
+            population = toolbox.populationCreator(n=POPULATION_SIZE)
+
+            # define the hall-of-fame object:
+            if COPY_FREE_ELITISM:
+                hof = elitism.ReferenceHallOfFame(HALL_OF_FAME_SIZE)
+            else:
+                hof = tools.HallOfFame(HALL_OF_FAME_SIZE)
+
+            # save the run periodically, and continue a previous run if it was interrupted:
+            checkpointer = checkpoint.Checkpointer(CHECKPOINT_PATH, CHECKPOINT_INTERVAL) if CHECKPOINT_PATH else None
+            resume = None
+            if CHECKPOINT_PATH and os.path.exists(CHECKPOINT_PATH):
+                resume = checkpoint.load(CHECKPOINT_PATH)
+                print("- Resuming from generation", resume['gen'], "of", CHECKPOINT_PATH)
+
+            # perform the Genetic Algorithm flow with hof feature added:
+            population, logbook = elitism.eaSimpleWithElitism(population, toolbox, cxpb=P_CROSSOVER, mutpb=P_MUTATION,
+                                                      ngen=MAX_GENERATIONS, stats=stats, halloffame=hof,
+                                                      verbose=not HEADLESS,
+                                                      batchEvaluate=BATCH_EVALUATION or PARALLEL_EVALUATION,
+                                                      fitnessCache=cache, copyOnWrite=COPY_FREE_ELITISM,
+                                                      stop=stop, profiler=profiler, checkpointer=checkpointer,
+                                                      resume=resume, telemetry=sink, localSearch=localSearch)
+            bestItems = hof.items
+
+            # the run is finished, the next one starts from scratch:
+            if checkpointer is not None:
+                checkpointer.remove()
+    finally:
+        if evaluator is not None:
+            evaluator.close()
+        if sink is not None:
+            sink.close()
+
+    if profiler:
+        profiler.exportFolded(PROFILE_PATH)
+        print("- Phase timings written to", PROFILE_PATH, ":", profiler.totals())
 
     # print hall of fame members info:
     print("- Best solutions are:")
     for i in range(HALL_OF_FAME_SIZE):
-        print(i, ": ", hof.items[i].fitness.values[0], " -> ", hof.items[i])
+        print(i, ": ", bestItems[i].fitness.values[0], " -> ", bestItems[i])
+
+    if not HEADLESS:
+        plotResults(logbook, bestItems[0])
+
+
+def plotResults(logbook, best):
+    """
+    Plots the min and average fitness over the generations and the best board.
+    matplotlib and seaborn are only imported here, so headless runs never load them.
+    """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
 
     # plot statistics:
     minFitnessValues, meanFitnessValues = logbook.select("min", "avg")
@@ -94,7 +221,7 @@ def main():
 
     # plot best solution:
     sns.set_style("whitegrid", {'axes.grid' : False})
-    nQueens.plotBoard(hof.items[0])
+    nQueens.plotBoard(best)
 
     # show both plots:
     plt.show()
@@ -0,0 +1,267 @@
+import array
+import random
+
+import numpy as np
+
+# Permutation crossover and mutation operators working on whole batches of boards at once.
+# Every batch operator takes 2-D int arrays with one permutation of range(N) per row, and returns new
+# arrays of the same shape whose rows are again permutations; the parents are left unchanged.
+# The single pair versions at the end of the module can be registered on a DEAP toolbox as mate and mutate.
+
+
+def _rng(rng):
+    # derive a NumPy generator from the random module when none is given, so that runs seeded with
+    # random.seed() stay reproducible (and checkpoints that save the random state resume identically):
+    return rng if rng is not None else np.random.default_rng(random.getrandbits(64))
+
+
+def _segments(rng, numRows, n):
+    """
+    :return: the start (inclusive) and end (exclusive) of a random segment for every row, as column vectors
+    """
+    cuts = np.sort(rng.integers(0, n + 1, size=(numRows, 2)), axis=1)
+    return cuts[:, :1], cuts[:, 1:]
+
+
+def _inverse(boards):
+    """
+    :return: the inverse permutations: inverse[r, boards[r, i]] == i
+    """
+    rows = np.arange(len(boards))[:, np.newaxis]
+    inverse = np.empty_like(boards)
+    inverse[rows, boards] = np.arange(boards.shape[1])
+    return inverse
+
+
+def _pmxChild(parent1, parent2, inSegment):
+    # the child takes the segment of parent2 and the other positions of parent1; a value of parent1 that
+    # is already in the copied segment is replaced by the parent1 value it displaced there, repeatedly,
+    # for all the positions of all the rows at once. Every round resolves one more link of the mapping
+    # chains and only keeps working on the positions that are still in conflict.
+    position2 = _inverse(parent2)
+    child = np.where(inSegment, parent2, parent1)
+    rows, columns = np.nonzero(~inSegment)
+    values = parent1[rows, columns]
+    while len(rows):
+        where = position2[rows, values]
+        conflicts = inSegment[rows, where]
+        rows, columns, where = rows[conflicts], columns[conflicts], where[conflicts]
+        values = parent1[rows, where]
+        child[rows, columns] = values
+    return child
+
+
+def cxPartialyMatchedBatch(parents1, parents2, rng=None):
+    """
+    Partially matched crossover (PMX) of every pair of rows, with a random segment per pair
+    :param parents1: a (pairs x N) int array of permutations
+    :param parents2: a (pairs x N) int array of permutations
+    :param rng: a numpy.random.Generator, derived from the random module when not given
+    :return: the two (pairs x N) arrays of children
+    """
+    parents1, parents2 = np.asarray(parents1), np.asarray(parents2)
+    start, end = _segments(_rng(rng), *parents1.shape)
+    columns = np.arange(parents1.shape[1])
+    inSegment = (columns >= start) & (columns < end)
+    return _pmxChild(parents1, parents2, inSegment), _pmxChild(parents2, parents1, inSegment)
+
+
+def _oxChild(parent1, parent2, start, end):
+    # the child keeps the segment of parent1; the other positions, visited from the end of the segment
+    # and wrapping around, receive the values of parent2 that are not in the segment, in the order they
+    # appear in parent2 from the same point.
+    numRows, n = parent1.shape
+    rows = np.arange(numRows)[:, np.newaxis]
+    columns = np.arange(n)
+    inSegment = (columns >= start) & (columns < end)
+
+    # the columns rotated to start at the end of the segment: the positions outside the segment come first
+    rotated = (columns + end) % n
+    donor = parent2[rows, rotated]
+
+    # a stable sort moves the donor values that are in the segment of parent1 to the end of every row:
+    segmentValue = np.zeros_like(inSegment)
+    segmentValue[rows, parent1] = inSegment
+    donor = np.take_along_axis(donor, np.argsort(segmentValue[rows, donor], axis=1, kind='stable'), axis=1)
+
+    child = np.empty_like(parent1)
+    child[rows, rotated] = np.where(columns < n - (end - start), donor, parent1[rows, rotated])
+    return child
+
+
+def cxOrderedBatch(parents1, parents2, rng=None):
+    """
+    Ordered crossover (OX) of every pair of rows, with a random segment per pair
+    :param parents1: a (pairs x N) int array of permutations
+    :param parents2: a (pairs x N) int array of permutations
+    :param rng: a numpy.random.Generator, derived from the random module when not given
+    :return: the two (pairs x N) arrays of children
+    """
+    parents1, parents2 = np.asarray(parents1), np.asarray(parents2)
+    start, end = _segments(_rng(rng), *parents1.shape)
+    return _oxChild(parents1, parents2, start, end), _oxChild(parents2, parents1, start, end)
+
+
+def cycleLabels(parents1, parents2):
+    """
+    Finds the cycles of the crossover of every pair: position i belongs to the same cycle as the position
+    of parents2[i] in parents1. The cycles are found by pointer jumping, in log2(N) vectorized rounds.
+    :return: a (pairs x N) array with the number of the cycle of every position, cycles numbered in the
+    order of their first position
+    """
+    parents1, parents2 = np.asarray(parents1), np.asarray(parents2)
+    numRows, n = parents1.shape
+    rows = np.arange(numRows)[:, np.newaxis]
+    columns = np.arange(n)
+
+    successor = _inverse(parents1)[rows, parents2]
+    labels = np.broadcast_to(columns, (numRows, n)).copy()
+    jumps = 1
+    while jumps < n:
+        # after k rounds, every label is the smallest position among the next 2^k of its cycle:
+        labels = np.minimum(labels, labels[rows, successor])
+        successor = successor[rows, successor]
+        jumps *= 2
+
+    cycleStarts = labels == columns
+    return (np.cumsum(cycleStarts, axis=1) - 1)[rows, labels]
+
+
+def cxCycleBatch(parents1, parents2, rng=None):
+    """
+    Cycle crossover (CX) of every pair of rows: the first child takes the odd cycles from the first
+    parent and the even cycles from the second, and the other way around for the second child.
+    The crossover is deterministic, rng is only accepted so that all the batch crossovers share a signature.
+    :param parents1: a (pairs x N) int array of permutations
+    :param parents2: a (pairs x N) int array of permutations
+    :return: the two (pairs x N) arrays of children
+    """
+    parents1, parents2 = np.asarray(parents1), np.asarray(parents2)
+    fromFirst = cycleLabels(parents1, parents2) % 2 == 0
+    return np.where(fromFirst, parents1, parents2), np.where(fromFirst, parents2, parents1)
+
+
+def mutSwapBatch(boards, rng=None):
+    """
+    Swaps two random positions of every row
+    :param boards: a (rows x N) int array of permutations
+    :param rng: a numpy.random.Generator, derived from the random module when not given
+    :return: the mutated (rows x N) array
+    """
+    boards = np.array(boards)
+    rng = _rng(rng)
+    rows = np.arange(len(boards))
+    i = rng.integers(0, boards.shape[1], size=len(boards))
+    j = rng.integers(0, boards.shape[1], size=len(boards))
+    boards[rows, i], boards[rows, j] = boards[rows, j], boards[rows, i]
+    return boards
+
+
+def mutInversionBatch(boards, rng=None):
+    """
+    Reverses a random segment of every row
+    :param boards: a (rows x N) int array of permutations
+    :param rng: a numpy.random.Generator, derived from the random module when not given
+    :return: the mutated (rows x N) array
+    """
+    boards = np.asarray(boards)
+    start, end = _segments(_rng(rng), *boards.shape)
+    columns = np.arange(boards.shape[1])
+    inSegment = (columns >= start) & (columns < end)
+    source = np.where(inSegment, start + end - 1 - columns, columns)
+    return np.take_along_axis(boards, source, axis=1)
+
+
+def mutScrambleBatch(boards, rng=None):
+    """
+    Shuffles a random segment of every row
+    :param boards: a (rows x N) int array of permutations
+    :param rng: a numpy.random.Generator, derived from the random module when not given
+    :return: the mutated (rows x N) array
+    """
+    boards = np.asarray(boards)
+    rng = _rng(rng)
+    start, end = _segments(rng, *boards.shape)
+    columns = np.arange(boards.shape[1])
+    inSegment = (columns >= start) & (columns < end)
+
+    # positions outside the segment sort to themselves, the ones inside get random keys within the segment:
+    keys = np.where(inSegment, start + rng.random(boards.shape) * (end - start), columns)
+    return np.take_along_axis(boards, np.argsort(keys, axis=1, kind='stable'), axis=1)
+
+
+def _rows(individual):
+    # a writable NumPy view of an int32 individual, or None for other sequences:
+    if isinstance(individual, np.ndarray):
+        return individual
+    if isinstance(individual, array.array) and individual.itemsize == 4:
+        return np.frombuffer(individual, dtype=np.int32)
+    return None
+
+
+def _store(individual, values):
+    view = _rows(individual)
+    if view is not None:
+        view[:] = values
+    else:
+        individual[:] = values.tolist()
+
+
+def _mateWith(batchOperator, ind1, ind2, rng):
+    children1, children2 = batchOperator(np.asarray(ind1)[np.newaxis], np.asarray(ind2)[np.newaxis], rng)
+    _store(ind1, children1[0])
+    _store(ind2, children2[0])
+    return ind1, ind2
+
+
+def _mutateWith(batchOperator, individual, rng):
+    _store(individual, batchOperator(np.asarray(individual)[np.newaxis], rng)[0])
+    return individual,
+
+
+def cxPartialyMatched(ind1, ind2, rng=None):
+    """
+    Single pair version of cxPartialyMatchedBatch(), modifying the individuals in place like the DEAP operators
+    :return: the two individuals
+    """
+    return _mateWith(cxPartialyMatchedBatch, ind1, ind2, rng)
+
+
+def cxOrdered(ind1, ind2, rng=None):
+    """
+    Single pair version of cxOrderedBatch(), modifying the individuals in place like the DEAP operators
+    :return: the two individuals
+    """
+    return _mateWith(cxOrderedBatch, ind1, ind2, rng)
+
+
+def cxCycle(ind1, ind2, rng=None):
+    """
+    Single pair version of cxCycleBatch(), modifying the individuals in place like the DEAP operators
+    :return: the two individuals
+    """
+    return _mateWith(cxCycleBatch, ind1, ind2, rng)
+
+
+def mutSwap(individual, rng=None):
+    """
+    Single individual version of mutSwapBatch(), modifying the individual in place like the DEAP operators
+    :return: a tuple with the individual
+    """
+    return _mutateWith(mutSwapBatch, individual, rng)
+
+
+def mutInversion(individual, rng=None):
+    """
+    Single individual version of mutInversionBatch(), modifying the individual in place like the DEAP operators
+    :return: a tuple with the individual
+    """
+    return _mutateWith(mutInversionBatch, individual, rng)
+
+
+def mutScramble(individual, rng=None):
+    """
+    Single individual version of mutScrambleBatch(), modifying the individual in place like the DEAP operators
+    :return: a tuple with the individual
+    """
+    return _mutateWith(mutScrambleBatch, individual, rng)
@@ -0,0 +1,100 @@
+import math
+import multiprocessing
+import os
+
+import numpy as np
+
+import queens
+
+# smallest amount of work (boards x queens) worth sending to a worker process in one message:
+MIN_QUEENS_PER_CHUNK = 1 << 16
+
+# below this amount of work per call the boards are evaluated in the calling process:
+MIN_PARALLEL_WORK = 1 << 18
+
+# number of chunks handed to every worker per call, so uneven chunks still balance out:
+CHUNKS_PER_WORKER = 4
+
+# the problem instance cached by every worker process, created once by _initWorker():
+_problem = None
+
+
+def _initWorker(numOfQueens):
+    global _problem
+    _problem = queens.NQueensProblem(numOfQueens)
+
+
+def _evaluateChunk(boards):
+    return _problem.getViolationsCountBatch(boards)
+
+
+def autoChunkSize(numOfQueens, populationSize, numWorkers):
+    """
+    Picks the number of boards sent to a worker in one message.
+    Chunks are small enough to give every worker a few of them, but never smaller than
+    MIN_QUEENS_PER_CHUNK queens, so that the evaluation work outweighs the IPC cost.
+    :param numOfQueens: the number of queens in the problem
+    :param populationSize: the number of boards evaluated in one call
+    :param numWorkers: the number of worker processes
+    :return: the number of boards per chunk
+    """
+    balancedSize = math.ceil(populationSize / (numWorkers * CHUNKS_PER_WORKER))
+    minimalSize = math.ceil(MIN_QUEENS_PER_CHUNK / max(1, numOfQueens))
+    return max(1, min(populationSize, max(balancedSize, minimalSize)))
+
+
+class ParallelEvaluator:
+    """Evaluates (pop_size x N) arrays of boards on a pool of worker processes.
+    Instances are callable, so they can be registered as toolbox.evaluateBatch and used with
+    eaSimpleWithElitism(..., batchEvaluate=True).
+    The pool is only started the first time a call carries enough work to pay for it; smaller
+    calls are evaluated in the calling process.
+    """
+
+    def __init__(self, numOfQueens, numWorkers=None, chunkSize=None):
+        """
+        :param numOfQueens: the number of queens in the problem
+        :param numWorkers: the number of worker processes, all the cores when None
+        :param chunkSize: the number of boards per message, picked by autoChunkSize() when None
+        """
+        self.problem = queens.NQueensProblem(numOfQueens)
+        self.numWorkers = numWorkers or os.cpu_count() or 1
+        self.chunkSize = chunkSize
+        self.pool = None
+
+    def __call__(self, boards):
+        """
+        :param boards: a (population size x number of queens) int array, one solution per row
+        :return: an int array with the number of violations of every row
+        """
+        boards = np.asarray(boards, dtype=np.int32)
+        popSize = len(boards)
+
+        if self.numWorkers == 1 or popSize * len(self.problem) < MIN_PARALLEL_WORK:
+            return self.problem.getViolationsCountBatch(boards)
+
+        chunkSize = self.chunkSize or autoChunkSize(len(self.problem), popSize, self.numWorkers)
+        if chunkSize >= popSize:
+            return self.problem.getViolationsCountBatch(boards)
+
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(self.numWorkers, initializer=_initWorker,
+                                             initargs=(len(self.problem),))
+
+        chunks = [boards[start:start + chunkSize] for start in range(0, popSize, chunkSize)]
+        return np.concatenate(self.pool.map(_evaluateChunk, chunks, chunksize=1))
+
+    def close(self):
+        """
+        Stops the worker processes, if they were started.
+        """
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
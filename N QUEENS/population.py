@@ -0,0 +1,189 @@
+import random
+
+import numpy as np
+
+
+def selTournamentIndices(fitness, k, tournsize, minimize=True, rng=None):
+    """Index-based version of DEAP selTournament(): runs k tournaments at once over a fitness vector.
+    :param fitness: the fitness vector of the population
+    :param k: the number of individuals to select
+    :param tournsize: the number of aspirants in every tournament
+    :param minimize: True if lower fitness is better
+    :param rng: a numpy Generator, seeded from the random module when None
+    :return: an int array with the indices of the k winners
+    """
+    if rng is None:
+        rng = np.random.default_rng(random.getrandbits(64))
+
+    aspirants = rng.integers(0, len(fitness), size=(k, tournsize))
+    scores = fitness[aspirants]
+    winners = np.argmin(scores, axis=1) if minimize else np.argmax(scores, axis=1)
+    return aspirants[np.arange(k), winners]
+
+
+class FitnessView:
+    """Exposes one entry of the store's fitness vector through the interface of deap.base.Fitness
+    that the statistics and the solver scripts use (values, valid).
+    """
+
+    __slots__ = ("store", "index")
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    @property
+    def values(self):
+        value = self.store.fitness[self.index]
+        return () if np.isnan(value) else (float(value),)
+
+    @values.setter
+    def values(self, values):
+        self.store.fitness[self.index] = values[0]
+
+    @values.deleter
+    def values(self):
+        self.store.fitness[self.index] = np.nan
+
+    @property
+    def valid(self):
+        return not np.isnan(self.store.fitness[self.index])
+
+
+class IndividualView:
+    """A lightweight handle to one row of the store, with a fitness attribute like a DEAP individual.
+    The handle refers to the row by index, so it stays valid when the store replaces its buffer.
+    """
+
+    __slots__ = ("store", "index", "fitness")
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+        self.fitness = FitnessView(store, index)
+
+    @property
+    def genome(self):
+        return self.store.genomes[self.index]
+
+    def __len__(self):
+        return self.store.genomes.shape[1]
+
+    def __getitem__(self, key):
+        return self.store.genomes[self.index][key]
+
+    def __setitem__(self, key, value):
+        self.store.genomes[self.index][key] = value
+
+    def __iter__(self):
+        return iter(self.store.genomes[self.index].tolist())
+
+    def __repr__(self):
+        return "IndividualView(%d, %s)" % (self.index, self.store.genomes[self.index].tolist())
+
+
+class PopulationStore:
+    """A population kept in one contiguous (pop_size x N) int32 buffer plus a fitness vector,
+    instead of a list of array.array individuals each with its own Fitness object.
+    Invalid fitness values are stored as NaN. Selection and replacement work on row indices and
+    copy the rows into a second, preallocated buffer, so no per-individual objects are allocated.
+    DEAP operators such as cxUniformPartialyMatched() and mutShuffleIndexes() can be applied to the
+    rows directly (store.genomes[i]), since they only index and assign the individual in place.
+    """
+
+    def __init__(self, genomes, fitness=None):
+        """
+        :param genomes: a (pop_size x N) int array, one individual per row
+        :param fitness: the fitness vector, all invalid when None
+        """
+        self.genomes = np.ascontiguousarray(genomes, dtype=np.int32)
+        if fitness is None:
+            fitness = np.full(len(self.genomes), np.nan)
+        self.fitness = np.asarray(fitness, dtype=np.float64)
+        self._spareGenomes = np.empty_like(self.genomes)
+        self._spareFitness = np.empty_like(self.fitness)
+        self._views = None
+
+    @classmethod
+    def random(cls, popSize, numOfQueens):
+        """
+        Creates a population of random permutations, using the random module like toolbox.randomOrder
+        :param popSize: the number of individuals
+        :param numOfQueens: the number of queens in the problem
+        :return: a new PopulationStore with invalid fitness values
+        """
+        genomes = np.empty((popSize, numOfQueens), dtype=np.int32)
+        for i in range(popSize):
+            genomes[i] = random.sample(range(numOfQueens), numOfQueens)
+        return cls(genomes)
+
+    def __len__(self):
+        return len(self.genomes)
+
+    def __getitem__(self, index):
+        return self.individuals()[index]
+
+    def individuals(self):
+        """
+        :return: the list of IndividualView handles of the population, created once per store
+        """
+        if self._views is None:
+            self._views = [IndividualView(self, i) for i in range(len(self))]
+        return self._views
+
+    def invalidIndices(self):
+        """
+        :return: the indices of the individuals with an invalid fitness
+        """
+        return np.flatnonzero(np.isnan(self.fitness))
+
+    def invalidate(self, indices):
+        """
+        :param indices: the indices of the individuals whose fitness is no longer valid
+        """
+        self.fitness[indices] = np.nan
+
+    def evaluate(self, evaluateBatch):
+        """
+        Evaluates the individuals with an invalid fitness in one call
+        :param evaluateBatch: a function taking a (k x N) int array and returning k fitness values
+        :return: the number of evaluated individuals
+        """
+        invalid = self.invalidIndices()
+        if len(invalid) > 0:
+            self.fitness[invalid] = np.asarray(evaluateBatch(self.genomes[invalid])).reshape(len(invalid))
+        return len(invalid)
+
+    def best(self, k, minimize=True):
+        """
+        Like the hall of fame, skips duplicates: a board repeated in the population is only taken once,
+        unless there are fewer than k distinct boards.
+        :param k: the number of individuals
+        :param minimize: True if lower fitness is better
+        :return: the indices of the k best distinct individuals, best first
+        """
+        order = np.argsort(self.fitness if minimize else -self.fitness, kind="stable")
+        chosen, seen = [], set()
+        for index in order.tolist():
+            board = self.genomes[index].tobytes()
+            if board not in seen:
+                seen.add(board)
+                chosen.append(index)
+                if len(chosen) == k:
+                    return np.array(chosen)
+
+        # not enough distinct boards, fill up with the best repeated ones:
+        chosenSet = set(chosen)
+        repeated = [index for index in order.tolist() if index not in chosenSet]
+        return np.array(chosen + repeated[:k - len(chosen)])
+
+    def replace(self, indices):
+        """
+        Replaces the population by the individuals at the given indices (repetitions allowed),
+        copying the rows into the spare buffer and swapping the buffers
+        :param indices: len(self) row indices of the current population
+        """
+        np.take(self.genomes, indices, axis=0, out=self._spareGenomes)
+        np.take(self.fitness, indices, out=self._spareFitness)
+        self.genomes, self._spareGenomes = self._spareGenomes, self.genomes
+        self.fitness, self._spareFitness = self._spareFitness, self.fitness
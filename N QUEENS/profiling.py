@@ -0,0 +1,74 @@
+import time
+
+
+class PhaseTimer:
+    """Splits the time of every generation into named phases.
+    A solver calls start() at the beginning of a generation, lap(phase) at the end of every phase and
+    end() at the end of the generation, which returns the seconds spent in every phase.
+    """
+
+    def __init__(self, root="run"):
+        """
+        :param root: the name of the root frame in the exported stacks, usually the solver's name
+        """
+        self.root = root
+        self.generations = []
+        self._current = {}
+        self._last = 0.0
+
+    def __bool__(self):
+        return True
+
+    def start(self):
+        self._current = {}
+        self._last = time.perf_counter()
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        self._current[phase] = self._current.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def end(self):
+        self.generations.append(self._current)
+        return self._current
+
+    def totals(self):
+        """
+        :return: the seconds spent in every phase, summed over all the generations
+        """
+        totals = {}
+        for timings in self.generations:
+            for phase, seconds in timings.items():
+                totals[phase] = totals.get(phase, 0.0) + seconds
+        return totals
+
+    def exportFolded(self, path):
+        """
+        Writes the phase totals in the folded stacks format ("root;phase microseconds" per line) read by
+        flamegraph.pl, speedscope and similar flame graph tools
+        :param path: the output file
+        """
+        with open(path, mode='w', encoding='utf-8') as f:
+            for phase, seconds in self.totals().items():
+                f.write("%s;%s %d\n" % (self.root, phase, round(seconds * 1e6)))
+
+
+class NullTimer:
+    """The disabled PhaseTimer: every call does nothing, so an un-profiled run only pays for a few
+    empty method calls per generation.
+    """
+
+    def __bool__(self):
+        return False
+
+    def start(self):
+        pass
+
+    def lap(self, phase):
+        pass
+
+    def end(self):
+        return {}
+
+
+NULL_TIMER = NullTimer()
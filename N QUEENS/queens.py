@@ -1,6 +1,10 @@
+from collections import Counter
+
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib as mpl
+
+# boards larger than this are plotted as a density image of at most MAX_PLOT_BINS x MAX_PLOT_BINS cells:
+MAX_PLOT_SQUARES = 64
+MAX_PLOT_BINS = 512
 
 class NQueensProblem:
     """This class encapsulates the N-Queens problem
@@ -27,6 +31,32 @@ class NQueensProblem:
         :return: the calculated value
         """
 
+        if len(positions) != self.numOfQueens:
+            raise ValueError("size of positions list should be equal to ", self.numOfQueens)
+
+        return countDiagonalViolations(positions)
+
+    def getViolationsCountBatch(self, boards):
+        """
+        Calculates the number of violations of a whole population of solutions in one vectorized pass
+        :param boards: a (population size x number of queens) int array, one solution per row
+        :return: an int array with the calculated value of every row
+        """
+
+        boards = np.asarray(boards)
+        if boards.ndim != 2 or boards.shape[1] != self.numOfQueens:
+            raise ValueError("boards should be a 2-D array with rows of size ", self.numOfQueens)
+
+        return countDiagonalViolationsBatch(boards)
+
+    def getViolationsCountPairwise(self, positions):
+        """
+        Reference O(N^2) implementation of getViolationsCount() that checks every pair of queens.
+        Kept to verify the diagonal-bucket implementation against.
+        :param positions: a list of indices corresponding to the positions of the queens in each row
+        :return: the calculated value
+        """
+
         if len(positions) != self.numOfQueens:
             raise ValueError("size of positions list should be equal to ", self.numOfQueens)
 
@@ -54,11 +84,17 @@ class NQueensProblem:
         """
         Plots the positions of the queens on the board according to the given solution
         :param positions: a list of indices corresponding to the positions of the queens in each row.
+        matplotlib is only imported here, so that solvers that never plot do not pay for loading it.
         """
+        import matplotlib.pyplot as plt
+        import matplotlib as mpl
 
         if len(positions) != self.numOfQueens:
             raise ValueError("size of positions list should be equal to ", self.numOfQueens)
 
+        if self.numOfQueens > MAX_PLOT_SQUARES:
+            return self.plotLargeBoard(positions)
+
         fig, ax = plt.subplots()
 
         # start with the board's squares:
@@ -86,6 +122,202 @@ class NQueensProblem:
 
         return plt
 
+    def plotLargeBoard(self, positions):
+        """
+        Plots a downsampled view of a large board: the board is divided into at most MAX_PLOT_BINS x MAX_PLOT_BINS
+        cells, and every cell is colored by the number of queens it holds, so no N x N array is created.
+        :param positions: a sequence of indices corresponding to the positions of the queens in each row.
+        """
+        import matplotlib.pyplot as plt
+
+        bins = min(self.numOfQueens, MAX_PLOT_BINS)
+        columns = np.arange(self.numOfQueens, dtype=np.int64) * bins // self.numOfQueens
+        rows = np.asarray(positions, dtype=np.int64) * bins // self.numOfQueens
+        density = np.bincount(rows * bins + columns, minlength=bins * bins).reshape(bins, bins)
+
+        fig, ax = plt.subplots()
+        image = ax.imshow(density, interpolation='nearest', cmap='viridis', extent=[0, self.numOfQueens,
+                                                                                    self.numOfQueens, 0])
+        fig.colorbar(image, ax=ax, label='queens per cell')
+        ax.set_title("%d queens, %d x %d cells" % (self.numOfQueens, bins, bins))
+
+        return plt
+
+
+def countDiagonalViolations(positions):
+    """
+    Counts the pairs of queens sharing a diagonal in O(N).
+    Every queen is dropped into the bucket of its main diagonal (column - row) and of its anti-diagonal
+    (column + row); a bucket holding k queens contributes k * (k - 1) / 2 attacking pairs.
+    Two queens in different columns can never share both diagonals, so the result is exactly the
+    pairwise count.
+    :param positions: a list of indices corresponding to the positions of the queens in each row
+    :return: the number of pairs of queens on the same diagonal
+    """
+    numOfQueens = len(positions)
+    if numOfQueens == 0:
+        return 0
+
+    if min(positions) < 0 or max(positions) >= numOfQueens:
+        # rows outside the board: fall back to sparse buckets so the count stays exact:
+        mainDiagonals = Counter(column - row for column, row in enumerate(positions))
+        antiDiagonals = Counter(column + row for column, row in enumerate(positions))
+        return sum(k * (k - 1) // 2 for k in mainDiagonals.values()) + \
+               sum(k * (k - 1) // 2 for k in antiDiagonals.values())
+
+    # dense buckets, one per diagonal of the board:
+    offset = numOfQueens - 1
+    mainDiagonals = [0] * (2 * numOfQueens - 1)
+    antiDiagonals = [0] * (2 * numOfQueens - 1)
+    for column, row in enumerate(positions):
+        mainDiagonals[column - row + offset] += 1
+        antiDiagonals[column + row] += 1
+
+    violations = 0
+    for k in mainDiagonals:
+        if k > 1:
+            violations += k * (k - 1) // 2
+    for k in antiDiagonals:
+        if k > 1:
+            violations += k * (k - 1) // 2
+
+    return violations
+
+
+def countDiagonalViolationsBatch(boards, maxBucketsPerPass=1 << 22):
+    """
+    Vectorized version of countDiagonalViolations() for many boards at once.
+    The diagonal buckets of all the boards are counted with a single bincount() over offset bucket
+    indices; large populations are processed in slices so the bucket matrix stays bounded in memory.
+    :param boards: a (population size x number of queens) int array, one solution per row
+    :param maxBucketsPerPass: upper bound on the number of buckets counted in one pass
+    :return: an int array with the number of pairs of queens on the same diagonal for every board
+    """
+    boards = np.asarray(boards)
+    popSize, numOfQueens = boards.shape
+    violations = np.zeros(popSize, dtype=np.int64)
+    if popSize == 0 or numOfQueens == 0:
+        return violations
+
+    if boards.min() < 0 or boards.max() >= numOfQueens:
+        raise ValueError("queen positions should be in the range [0, ", numOfQueens, ")")
+
+    numDiagonals = 2 * numOfQueens - 1
+    columns = np.arange(numOfQueens)
+    rowsPerPass = max(1, maxBucketsPerPass // numDiagonals)
+
+    for start in range(0, popSize, rowsPerPass):
+        chunk = boards[start:start + rowsPerPass].astype(np.int64)
+        numRows = chunk.shape[0]
+        # shift the buckets of every board to its own range of numDiagonals bins:
+        rowOffsets = (np.arange(numRows) * numDiagonals)[:, np.newaxis]
+        for diagonals in (columns - chunk + numOfQueens - 1, columns + chunk):
+            counts = np.bincount((diagonals + rowOffsets).ravel(), minlength=numRows * numDiagonals)
+            counts = counts.reshape(numRows, numDiagonals)
+            violations[start:start + numRows] += (counts * (counts - 1) // 2).sum(axis=1)
+
+    return violations
+
+
+class BoardEvaluator:
+    """Keeps the diagonal occupancy counters of a single board, so that the effect of swapping two queens
+    can be calculated in O(1) instead of re-scoring the whole board.
+    Swaps can be applied and undone, which lets a solver try a move, read its effect and throw it away.
+    """
+
+    def __init__(self, positions):
+        """
+        :param positions: a list of indices corresponding to the positions of the queens in each row.
+        The list is owned by the evaluator from now on and is modified in place by applySwap() and undoSwap().
+        """
+        self.positions = positions
+        self.offset = len(positions) - 1
+        self.mainDiagonals = [0] * (2 * len(positions) - 1)
+        self.antiDiagonals = [0] * (2 * len(positions) - 1)
+        self.violations = 0
+        self.appliedSwaps = []
+
+        for column, row in enumerate(positions):
+            self.violations += self._addQueen(column, row)
+
+    def __len__(self):
+        """
+        :return: the number of queens
+        """
+        return len(self.positions)
+
+    def getConflicts(self, i):
+        """
+        :param i: a row of the board
+        :return: the number of queens that attack the queen of row i
+        """
+        column, row = i, self.positions[i]
+        return self.mainDiagonals[column - row + self.offset] + self.antiDiagonals[column + row] - 2
+
+    def _addQueen(self, column, row):
+        # the new queen attacks every queen already on its two diagonals:
+        main = column - row + self.offset
+        anti = column + row
+        delta = self.mainDiagonals[main] + self.antiDiagonals[anti]
+        self.mainDiagonals[main] += 1
+        self.antiDiagonals[anti] += 1
+        return delta
+
+    def _removeQueen(self, column, row):
+        # the removed queen no longer attacks the queens left on its two diagonals:
+        main = column - row + self.offset
+        anti = column + row
+        self.mainDiagonals[main] -= 1
+        self.antiDiagonals[anti] -= 1
+        return -(self.mainDiagonals[main] + self.antiDiagonals[anti])
+
+    def _swap(self, i, j):
+        positions = self.positions
+        row1, row2 = positions[i], positions[j]
+        delta = self._removeQueen(i, row1) + self._removeQueen(j, row2)
+        delta += self._addQueen(i, row2) + self._addQueen(j, row1)
+        positions[i], positions[j] = row2, row1
+        self.violations += delta
+        return delta
+
+    def swapDelta(self, i, j):
+        """
+        Calculates the change in the number of violations caused by swapping the queens of rows i and j,
+        without modifying the board.
+        :param i: the first row to swap
+        :param j: the second row to swap
+        :return: the change in the number of violations
+        """
+        if i == j:
+            return 0
+        delta = self._swap(i, j)
+        self._swap(i, j)
+        return delta
+
+    def applySwap(self, i, j):
+        """
+        Swaps the queens of rows i and j, updating the diagonal counters and the violations count.
+        :param i: the first row to swap
+        :param j: the second row to swap
+        :return: the change in the number of violations
+        """
+        self.appliedSwaps.append((i, j))
+        return self._swap(i, j)
+
+    def undoSwap(self):
+        """
+        Reverts the most recent swap that was applied and not yet committed.
+        :return: the change in the number of violations
+        """
+        i, j = self.appliedSwaps.pop()
+        return self._swap(i, j)
+
+    def commit(self):
+        """
+        Accepts all the swaps applied so far; they can no longer be undone.
+        """
+        self.appliedSwaps.clear()
+
 
 # testing the class:
 def main():
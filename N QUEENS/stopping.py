@@ -0,0 +1,125 @@
+import time
+
+
+class SearchState:
+    """The progress of a run, as seen by the stopping criteria after every generation.
+    """
+
+    def __init__(self, gen, bestFitness, nevals, elapsed):
+        """
+        :param gen: the generation that was just completed
+        :param bestFitness: the best fitness value found so far
+        :param nevals: the total number of evaluations so far
+        :param elapsed: the wall-clock seconds since the run started
+        """
+        self.gen = gen
+        self.bestFitness = bestFitness
+        self.nevals = nevals
+        self.elapsed = elapsed
+
+
+class StoppingCriterion:
+    """Base class of the stopping criteria. reset() is called when a run starts, and check() after every
+    generation; check() returns a short reason string to stop the run, or None to continue.
+    """
+
+    def reset(self):
+        pass
+
+    def check(self, state):
+        raise NotImplementedError
+
+
+class TargetFitness(StoppingCriterion):
+    """Stops once the best fitness reaches the target, e.g. a board with zero violations."""
+
+    def __init__(self, target=0.0, minimize=True):
+        self.target = target
+        self.minimize = minimize
+
+    def check(self, state):
+        reached = state.bestFitness <= self.target if self.minimize else state.bestFitness >= self.target
+        return "target fitness %g reached" % self.target if reached else None
+
+
+class NoImprovement(StoppingCriterion):
+    """Stops when the best fitness did not improve for the given number of generations."""
+
+    def __init__(self, generations, minimize=True):
+        self.generations = generations
+        self.minimize = minimize
+        self.reset()
+
+    def reset(self):
+        self.best = None
+        self.bestGen = 0
+
+    def check(self, state):
+        if self.best is None or (state.bestFitness < self.best if self.minimize else state.bestFitness > self.best):
+            self.best = state.bestFitness
+            self.bestGen = state.gen
+            return None
+        if state.gen - self.bestGen >= self.generations:
+            return "no improvement for %d generations" % self.generations
+        return None
+
+
+class TimeBudget(StoppingCriterion):
+    """Stops once the run has used the given number of wall-clock seconds."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def check(self, state):
+        return "time budget of %gs used" % self.seconds if state.elapsed >= self.seconds else None
+
+
+class EvaluationBudget(StoppingCriterion):
+    """Stops once the run has used the given number of fitness evaluations."""
+
+    def __init__(self, maxEvaluations):
+        self.maxEvaluations = maxEvaluations
+
+    def check(self, state):
+        if state.nevals >= self.maxEvaluations:
+            return "evaluation budget of %d used" % self.maxEvaluations
+        return None
+
+
+class Stopper:
+    """Runs a list of stopping criteria together and keeps track of the time and evaluations used."""
+
+    def __init__(self, criteria):
+        """
+        :param criteria: a list of StoppingCriterion objects, the run stops when any of them says so
+        """
+        self.criteria = list(criteria or [])
+        self.startTime = time.perf_counter()
+        self.nevals = 0
+        for criterion in self.criteria:
+            criterion.reset()
+
+    def __getstate__(self):
+        # perf_counter() values are only meaningful within a process: save the elapsed time instead
+        state = dict(self.__dict__)
+        state['startTime'] = time.perf_counter() - self.startTime
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.startTime = time.perf_counter() - state['startTime']
+
+    def check(self, gen, bestFitness, nevals):
+        """
+        :param gen: the generation that was just completed
+        :param bestFitness: the best fitness value found so far
+        :param nevals: the number of evaluations made in this generation
+        :return: the reason to stop, or None to continue
+        """
+        self.nevals += nevals
+        state = SearchState(gen, bestFitness, self.nevals, time.perf_counter() - self.startTime)
+        for criterion in self.criteria:
+            reason = criterion.check(state)
+            if reason is not None:
+                return reason
+        return None
@@ -0,0 +1,120 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+
+import benchmark
+
+# grid used when no spec file is given:
+DEFAULT_GRID = {
+    "algorithms": ["ga", "firefly"],
+    "n": [8, 16],
+    "pop": [60],
+    "gens": [60],
+    "seeds": [1, 2, 3, 4, 5],
+}
+
+
+def expandGrid(grid):
+    """
+    :param grid: a dictionary with the lists "algorithms", "n", "pop", "gens" and "seeds"
+    :return: the list of run configurations, one dictionary per combination
+    """
+    return [dict(algorithm=algorithm, n=n, pop=pop, gens=gens, seed=seed)
+            for algorithm, n, pop, gens, seed in itertools.product(grid["algorithms"], grid["n"], grid["pop"],
+                                                                   grid["gens"], grid["seeds"])]
+
+
+def resultPath(resultsDir, config):
+    """
+    :return: the file holding the result of the given run configuration
+    """
+    name = "%(algorithm)s_n%(n)d_pop%(pop)d_gens%(gens)d_seed%(seed)d.json" % config
+    return os.path.join(resultsDir, name)
+
+
+def _runConfig(args):
+    # runs in a fresh worker process (maxtasksperchild=1), so the deap.creator classes that
+    # run_genetic_algorithm() deletes and recreates are never shared with another run.
+    config, resultsDir, repeats, memory = args
+    record = benchmark.measureRun(config["algorithm"], config["n"], config["pop"], config["gens"], config["seed"],
+                                  repeats, memory)
+
+    # write to a temporary file first, so an interrupted sweep never leaves a partial result behind:
+    path = resultPath(resultsDir, config)
+    with open(path + ".tmp", mode='w', encoding='utf-8') as f:
+        json.dump(record, f, indent=2)
+    os.replace(path + ".tmp", path)
+    return record
+
+
+def loadResults(resultsDir, configs):
+    """
+    :return: the records of the given configurations already stored in resultsDir
+    """
+    records = []
+    for config in configs:
+        path = resultPath(resultsDir, config)
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                records.append(json.load(f))
+    return records
+
+
+def runSweep(grid, resultsDir, workers=None, repeats=1, memory=False, verbose=True):
+    """
+    Runs every configuration of the grid on a process pool, skipping the ones whose result file
+    already exists, so an interrupted sweep resumes where it stopped.
+    Every run gets its own worker process, which isolates the DEAP creator registry of concurrent runs.
+    :return: the records of all the configurations of the grid, old and new
+    """
+    os.makedirs(resultsDir, exist_ok=True)
+    configs = expandGrid(grid)
+    pending = [config for config in configs if not os.path.exists(resultPath(resultsDir, config))]
+    if verbose:
+        print("%d runs in the grid, %d already done, %d to run" % (len(configs), len(configs) - len(pending),
+                                                                    len(pending)))
+
+    if pending:
+        with multiprocessing.Pool(workers, maxtasksperchild=1) as pool:
+            tasks = [(config, resultsDir, repeats, memory) for config in pending]
+            for done, record in enumerate(pool.imap_unordered(_runConfig, tasks), start=1):
+                if verbose:
+                    print("[%d/%d] %-40s seed=%-6d %8.4fs  solved=%s" % (done, len(pending),
+                                                                         benchmark.configKey(record), record["seed"],
+                                                                         record["wall_time"], record["solved"]))
+
+    return loadResults(resultsDir, configs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parallel, resumable sweep of solver comparisons")
+    parser.add_argument("--grid", help="JSON file with the lists algorithms, n, pop, gens and seeds")
+    parser.add_argument("--results", default="sweep_results", help="directory with one result file per run")
+    parser.add_argument("--workers", type=int, help="number of worker processes, all the cores by default")
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--memory", action="store_true")
+    parser.add_argument("--table", help="where to write the aggregated CSV table, <results>/table.csv by default")
+    args = parser.parse_args(argv)
+
+    grid = dict(DEFAULT_GRID)
+    if args.grid:
+        with open(args.grid, encoding='utf-8') as f:
+            grid.update(json.load(f))
+
+    records = runSweep(grid, args.results, args.workers, args.repeats, args.memory)
+    records.sort(key=lambda record: (benchmark.configKey(record), record["seed"]))
+    benchmark.writeCsv(records, args.table or os.path.join(args.results, "table.csv"))
+
+    summary = benchmark.summarize(records)
+    print("\n%-40s %6s %12s %14s %8s" % ("configuration", "runs", "median (s)", "evals/s", "success"))
+    for key, entry in sorted(summary.items()):
+        print("%-40s %6d %12.4f %14.0f %8.2f" % (key, entry["runs"], entry["median_wall_time"],
+                                                 entry["median_evals_per_sec"], entry["success_rate"]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
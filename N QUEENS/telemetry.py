@@ -0,0 +1,173 @@
+import argparse
+import json
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+
+_STOP = object()
+
+
+def _toJson(value):
+    # NumPy scalars and arrays found in the logbook records:
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+class TelemetrySink:
+    """Streams one JSON record per generation to an append-only file (JSON lines) or to a local UDP socket.
+    emit() only stamps the record and puts it in a queue, the encoding and the I/O are done by a background
+    writer thread, so the generation loop never waits for the disk or the console. When the writer falls
+    behind and the queue is full, records are dropped and counted instead of blocking the run.
+    """
+
+    def __init__(self, path=None, address=None, maxQueue=10000):
+        """
+        :param path: the file the records are appended to
+        :param address: a (host, port) tuple to send the records to as UDP datagrams, instead of a file
+        :param maxQueue: the maximal number of records waiting to be written
+        """
+        if (path is None) == (address is None):
+            raise ValueError("exactly one of path and address should be given")
+
+        self.path = path
+        self.address = address
+        self.dropped = 0
+        self.startTime = time.perf_counter()
+        self._lastTime = self.startTime
+        self._queue = queue.Queue(maxQueue)
+        self._thread = threading.Thread(target=self._write, daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def emit(self, record):
+        """
+        Queues a record, adding the seconds since the sink was created under 'time' and, when the
+        record has an 'nevals' field, the evaluations per second since the previous record under 'evals_per_sec'
+        :param record: a dictionary, e.g. a logbook record
+        """
+        now = time.perf_counter()
+        record = dict(record, time=now - self.startTime)
+        if 'nevals' in record and now > self._lastTime:
+            record['evals_per_sec'] = record['nevals'] / (now - self._lastTime)
+        self._lastTime = now
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """
+        Writes the queued records and stops the writer thread
+        """
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def _write(self):
+        if self.path is not None:
+            out = open(self.path, mode='a', encoding='utf-8')
+            send = out.write
+        else:
+            out = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            send = lambda line: out.sendto(line.encode('utf-8'), self.address)
+
+        try:
+            running = True
+            while running:
+                # wait for a record, then write everything that is already queued in one go:
+                batch = [self._queue.get()]
+                while True:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if batch[-1] is _STOP:
+                    batch.pop()
+                    running = False
+
+                for record in batch:
+                    send(json.dumps(record, default=_toJson) + "\n")
+                if self.path is not None:
+                    out.flush()
+        finally:
+            out.close()
+
+
+def follow(path, pollInterval=0.2):
+    """
+    Tails a telemetry file, waiting for the file and for new records
+    :return: a generator of the records, in the order they were written
+    """
+    while not os.path.exists(path):
+        time.sleep(pollInterval)
+
+    with open(path, encoding='utf-8') as f:
+        pending = ""
+        while True:
+            line = f.readline()
+            if not line:
+                time.sleep(pollInterval)
+                continue
+            pending += line
+            if pending.endswith("\n"):
+                yield json.loads(pending)
+                pending = ""
+
+
+def listen(port, host="127.0.0.1"):
+    """
+    :return: a generator of the records received on the given UDP port
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((host, port))
+    try:
+        while True:
+            data, _ = sock.recvfrom(65536)
+            yield json.loads(data)
+    finally:
+        sock.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Live viewer of the telemetry of a running solver")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--file", help="a telemetry file to tail")
+    source.add_argument("--udp", type=int, help="a UDP port to listen on")
+    parser.add_argument("--plot", action="store_true", help="plot min/avg fitness live (needs matplotlib)")
+    args = parser.parse_args(argv)
+
+    records = follow(args.file) if args.file else listen(args.udp)
+
+    if args.plot:
+        import matplotlib.pyplot as plt
+        plt.ion()
+        gens, mins, avgs = [], [], []
+
+    for record in records:
+        print("gen=%-6s min=%-10s avg=%-12s evals/s=%s" % (record.get('gen'), record.get('min'), record.get('avg'),
+                                                           round(record.get('evals_per_sec', 0))))
+        if args.plot and 'min' in record:
+            gens.append(record['gen'])
+            mins.append(record['min'])
+            avgs.append(record.get('avg'))
+            plt.clf()
+            plt.plot(gens, mins, color='red')
+            if None not in avgs:
+                plt.plot(gens, avgs, color='green')
+            plt.xlabel('Generation')
+            plt.ylabel('Min / Average Fitness')
+            plt.pause(0.01)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
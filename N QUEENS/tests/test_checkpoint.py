@@ -0,0 +1,66 @@
+import random
+
+import numpy as np
+import pytest
+from deap import tools
+
+import checkpoint
+import elitism
+import fitness_cache
+import n_queens
+from firefly_solver import FireflyAlgorithm
+
+
+def _runGA(ngen, withCache, checkpointer=None, resume=None):
+    random.seed(7)
+    population = n_queens.toolbox.populationCreator(n=40)
+    halloffame = tools.HallOfFame(4)
+    stats = tools.Statistics(lambda ind: ind.fitness.values)
+    stats.register("min", np.min)
+    stats.register("avg", np.mean)
+    cache = fitness_cache.FitnessCache(1000) if withCache else None
+    population, logbook = elitism.eaSimpleWithElitism(population, n_queens.toolbox, cxpb=0.9, mutpb=0.1,
+                                                      ngen=ngen, stats=stats, halloffame=halloffame,
+                                                      verbose=False, fitnessCache=cache,
+                                                      checkpointer=checkpointer, resume=resume)
+    return [list(ind) for ind in population], [list(ind) for ind in halloffame.items], list(logbook)
+
+
+@pytest.mark.parametrize("withCache", [False, True])
+def test_ga_resume_matches_uninterrupted_run(tmp_path, withCache):
+    path = str(tmp_path / "ga.ckpt")
+    expected = _runGA(20, withCache)
+
+    # a run interrupted after generation 10, then resumed from its last checkpoint:
+    _runGA(10, withCache, checkpointer=checkpoint.Checkpointer(path, interval=5))
+    resume = checkpoint.load(path)
+    assert resume['gen'] == 10
+    random.seed(12345)  # the random state must come from the checkpoint
+    assert _runGA(20, withCache, resume=resume) == expected
+
+
+@pytest.mark.parametrize("vectorized", [False, True])
+def test_firefly_resume_matches_uninterrupted_run(tmp_path, vectorized):
+    path = str(tmp_path / "firefly.ckpt")
+
+    def run(maxGenerations, checkpointer=None, resume=None):
+        random.seed(11)
+        solver = FireflyAlgorithm(10, 15, gamma=0.01)
+        best, solution, history, _ = solver.run(maxGenerations, vectorized=vectorized, stop=[],
+                                                checkpointer=checkpointer, resume=resume)
+        return best, solution, history, solver.population, solver.evaluations
+
+    expected = run(16)
+    run(8, checkpointer=checkpoint.Checkpointer(path, interval=4))
+    resume = checkpoint.load(path)
+    assert resume['generation'] == 7
+    assert run(16, resume=resume) == expected
+
+
+def test_remove_deletes_the_checkpoint(tmp_path):
+    path = str(tmp_path / "run.ckpt")
+    checkpointer = checkpoint.Checkpointer(path, interval=1)
+    checkpointer.save({'gen': 1})
+    checkpointer.remove()
+    assert not (tmp_path / "run.ckpt").exists()
+    checkpointer.remove()  # nothing left to delete
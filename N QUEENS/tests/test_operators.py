@@ -0,0 +1,63 @@
+import array
+import random
+
+import numpy as np
+import pytest
+
+import operators
+
+N = 13
+
+
+def _boards(rng, rows):
+    return np.array([rng.permutation(N) for _ in range(rows)])
+
+
+def _assertPermutations(boards):
+    assert (np.sort(boards, axis=1) == np.arange(N)).all()
+
+
+@pytest.mark.parametrize("crossover", [operators.cxPartialyMatchedBatch, operators.cxOrderedBatch,
+                                       operators.cxCycleBatch])
+def test_batch_crossover_returns_permutations(crossover):
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        parents1, parents2 = _boards(rng, 30), _boards(rng, 30)
+        copies = parents1.copy(), parents2.copy()
+        children1, children2 = crossover(parents1, parents2, rng)
+        assert children1.shape == children2.shape == parents1.shape
+        _assertPermutations(children1)
+        _assertPermutations(children2)
+        # the parents are left unchanged:
+        assert (parents1 == copies[0]).all() and (parents2 == copies[1]).all()
+
+
+@pytest.mark.parametrize("mutation", [operators.mutSwapBatch, operators.mutInversionBatch,
+                                      operators.mutScrambleBatch])
+def test_batch_mutation_returns_permutations(mutation):
+    rng = np.random.default_rng(1)
+    for _ in range(20):
+        boards = _boards(rng, 30)
+        copy = boards.copy()
+        mutated = mutation(boards, rng)
+        assert mutated.shape == boards.shape
+        _assertPermutations(mutated)
+        assert (boards == copy).all()
+
+
+@pytest.mark.parametrize("crossover", [operators.cxPartialyMatched, operators.cxOrdered, operators.cxCycle])
+def test_pair_crossover_keeps_individuals_permutations(crossover):
+    random.seed(2)
+    for _ in range(50):
+        ind1 = array.array('i', random.sample(range(N), N))
+        ind2 = random.sample(range(N), N)
+        child1, child2 = crossover(ind1, ind2)
+        assert sorted(child1) == sorted(child2) == list(range(N))
+
+
+@pytest.mark.parametrize("mutation", [operators.mutSwap, operators.mutInversion, operators.mutScramble])
+def test_pair_mutation_keeps_individuals_permutations(mutation):
+    random.seed(3)
+    for _ in range(50):
+        individual, = mutation(array.array('i', random.sample(range(N), N)))
+        assert sorted(individual) == list(range(N))
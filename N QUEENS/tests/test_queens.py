@@ -0,0 +1,64 @@
+import random
+
+import numpy as np
+import pytest
+
+from queens import NQueensProblem, BoardEvaluator, countDiagonalViolations, countDiagonalViolationsBatch
+
+
+@pytest.mark.parametrize("n", [1, 2, 5, 8, 17])
+def test_diagonal_buckets_match_pairwise(n):
+    rng = random.Random(n)
+    problem = NQueensProblem(n)
+    boards = [rng.sample(range(n), n) for _ in range(50)]
+    expected = [problem.getViolationsCountPairwise(board) for board in boards]
+    assert [countDiagonalViolations(board) for board in boards] == expected
+    assert list(problem.getViolationsCountBatch(np.array(boards))) == expected
+
+
+def test_batch_in_small_passes():
+    rng = random.Random(1)
+    boards = np.array([rng.sample(range(12), 12) for _ in range(40)])
+    assert list(countDiagonalViolationsBatch(boards, maxBucketsPerPass=50)) == \
+           list(countDiagonalViolationsBatch(boards))
+
+
+def test_out_of_range_rows_fall_back_to_counter():
+    problem = NQueensProblem(4)
+    # rows outside [0, N) are off the board, but the pairwise count is still well defined:
+    for board in ([0, 5, -1, 3], [-3, -2, -1, 0], [9, 9, 9, 9], [0, 1, 2, 7]):
+        assert countDiagonalViolations(board) == problem.getViolationsCountPairwise(board)
+    with pytest.raises(ValueError):
+        problem.getViolationsCountBatch(np.array([[0, 5, -1, 3]]))
+
+
+def test_board_evaluator_random_swaps():
+    rng = random.Random(3)
+    n = 20
+    problem = NQueensProblem(n)
+    board = BoardEvaluator(rng.sample(range(n), n))
+    for _ in range(500):
+        i, j = rng.randrange(n), rng.randrange(n)
+        before = board.violations
+        delta = board.swapDelta(i, j)
+        # swapDelta() leaves the board unchanged:
+        assert board.violations == before == problem.getViolationsCountPairwise(board.positions)
+
+        assert board.applySwap(i, j) == delta
+        assert board.violations == before + delta == problem.getViolationsCountPairwise(board.positions)
+        for row in range(n):
+            attackers = sum(1 for other in range(n) if other != row and
+                            abs(other - row) == abs(board.positions[other] - board.positions[row]))
+            assert board.getConflicts(row) == attackers
+
+        action = rng.random()
+        if action < 0.4:
+            positions = list(board.positions)
+            board.undoSwap()
+            positions[i], positions[j] = positions[j], positions[i]
+            assert board.positions == positions
+            assert board.violations == before
+        elif action < 0.7:
+            board.commit()
+            assert board.appliedSwaps == []
+    assert board.violations == problem.getViolationsCountPairwise(board.positions)
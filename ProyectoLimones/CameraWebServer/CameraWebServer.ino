@@ -77,9 +77,14 @@ void loop() {
     Serial.println(">> Pidiendo imagen...");
     
     http.begin(url_get);
+    // El servidor presta cada imagen con un ID; hay que devolverlo en el reporte
+    const char* headers_respuesta[] = {"X-Image-Id"};
+    http.collectHeaders(headers_respuesta, 1);
     int httpCode = http.GET();
 
     if (httpCode == 200) {
+      String image_id = http.header("X-Image-Id");
+
       // Recibir los bytes
       int len = http.getSize();
       WiFiClient *stream = http.getStreamPtr();
@@ -124,6 +129,7 @@ void loop() {
         String url_post = String("http://") + server_ip + ":" + server_port + "/report-result";
         http.begin(url_post);
         http.addHeader("Content-Type", "text/plain");
+        http.addHeader("X-Image-Id", image_id);
         int postCode = http.POST(reporte);
         
         if (postCode == 200) {
@@ -145,6 +151,11 @@ void loop() {
       Serial.println("-----------------------------");
       is_finished = true;
       http.end();
+    } else if (httpCode == 503) {
+      // Las imágenes que quedan están prestadas a otras placas: se vuelve a preguntar por si alguna vence
+      Serial.println("Sin imágenes libres por ahora, esperando...");
+      http.end();
+      delay(2000);
     } else {
       Serial.printf("Error conectando al servidor: %d\n", httpCode);
       http.end();
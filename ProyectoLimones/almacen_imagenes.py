@@ -0,0 +1,308 @@
+import os
+import json
+import mmap
+import time
+import hashlib
+import threading
+
+from PIL import Image
+
+# --- ALMACÉN DE IMÁGENES PREPROCESADAS ---
+# Todo el dataset se convierte UNA vez a cuadros de ANCHO x ALTO x 4 bytes (RGBA) y se guarda en un solo
+# archivo binario (blob), con un índice JSON al lado. El servidor mapea el blob en memoria (mmap) y
+# responde cada petición con una rebanada del mapa, sin volver a abrir el JPEG ni correr PIL.
+# El blob solo se reconstruye cuando cambia algún archivo de origen (fecha de modificación y, si cambió,
+# su hash), cuando aparecen o desaparecen imágenes, o cuando cambia el tamaño de los cuadros.
+# Las imágenes que no se pueden decodificar se anotan en el índice como fallidas (sin cuadro): mientras el
+# archivo no cambie, se saltan sin volver a intentarlo ni reconstruir el blob.
+# La reconstrucción puede correr en segundo plano: los cuadros se van sirviendo a medida que se escriben,
+# y las imágenes nuevas las prepara por adelantado un pool de procesos (ver precarga.py).
+
+VERSION_INDICE = 1
+CANALES = 4  # RGBA (obligatorio para la ESP32)
+EXTENSIONES = ('.png', '.jpg', '.jpeg')
+
+
+def preparar_imagen(ruta, ancho, alto):
+    """Recorte central + RGBA + LANCZOS, el mismo pre-procesamiento que hacía el servidor por petición.
+    Devuelve los bytes crudos del cuadro (ancho * alto * 4)."""
+    img = Image.open(ruta)
+
+    # Recorte central: se corta un cuadrado del centro para conservar la forma REAL del limón
+    w, h = img.size
+    min_dim = min(w, h)
+    left = (w - min_dim) / 2
+    top = (h - min_dim) / 2
+    right = (w + min_dim) / 2
+    bottom = (h + min_dim) / 2
+    img = img.crop((left, top, right, bottom))
+
+    img = img.convert('RGBA')
+    img = img.resize((ancho, alto), Image.Resampling.LANCZOS)
+    return img.tobytes()
+
+
+def escanear_imagenes(carpeta):
+    """Lista las imágenes del dataset (la etiqueta real es el nombre de la carpeta que las contiene),
+    en un orden estable para que el índice no cambie entre corridas."""
+    imagenes = []
+    for root, dirs, files in os.walk(carpeta):
+        dirs.sort()
+        for filename in sorted(files):
+            if filename.lower().endswith(EXTENSIONES):
+                full_path = os.path.join(root, filename)
+                imagenes.append({'path': full_path,
+                                 'rel_path': os.path.relpath(full_path, carpeta).replace(os.sep, '/'),
+                                 'name': filename,
+                                 'label': os.path.basename(root)})
+    return imagenes
+
+
+def hash_archivo(ruta):
+    h = hashlib.blake2b(digest_size=16)
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def _mismo_contenido(img, entrada):
+    # Misma fecha y tamaño: se da por igual sin leer el archivo. Si la fecha cambió (copia, checkout...),
+    # decide el hash. Deja en img el hash que le corresponde.
+    if entrada['mtime_ns'] == img['mtime_ns'] and entrada['size'] == img['size']:
+        img['hash'] = entrada['hash']
+        return True
+    img['hash'] = hash_archivo(img['path'])
+    return img['hash'] == entrada['hash']
+
+
+class AlmacenImagenes:
+    """Blob de cuadros RGBA de tamaño fijo + índice, mapeado en memoria."""
+
+    def __init__(self, carpeta, ruta_blob, ruta_indice=None, ancho=96, alto=96):
+        self.carpeta = carpeta
+        self.ruta_blob = ruta_blob
+        self.ruta_indice = ruta_indice or os.path.splitext(ruta_blob)[0] + '.json'
+        self.ancho = ancho
+        self.alto = alto
+        self.tam_cuadro = ancho * alto * CANALES
+        self.entradas = []   # Una por cuadro: path, rel_path, name, label, mtime_ns, size, hash
+        self._archivo = None
+        self._mapa = None
+        self._hilo = None
+        self._precarga = None
+        self._construyendo = False
+        self._listo = threading.Condition()
+        # Estadísticas de las peticiones que tuvieron que esperar a que su cuadro estuviera escrito
+        self.esperas = 0
+        self.tiempo_espera = 0.0
+
+    def __len__(self):
+        return len(self.entradas)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def _leer_indice(self):
+        try:
+            with open(self.ruta_indice, encoding='utf-8') as f:
+                indice = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if (indice.get('version') != VERSION_INDICE or indice.get('ancho') != self.ancho or
+                indice.get('alto') != self.alto or not os.path.exists(self.ruta_blob) or
+                os.path.getsize(self.ruta_blob) != len(indice['entradas']) * self.tam_cuadro):
+            return None
+        return indice
+
+    def actualizar(self, procesos=None, profundidad=8, esperar=True):
+        """Sincroniza el blob con la carpeta y lo abre. Solo se convierten las imágenes nuevas o cuyo
+        contenido cambió (en paralelo, con `procesos` procesos y hasta `profundidad` imágenes por
+        adelantado); los cuadros que siguen vigentes se copian del blob anterior.
+        Con esperar=False la reconstrucción sigue en un hilo y cuadro(i) espera solo a que el cuadro i
+        esté escrito, así el servidor puede empezar a responder de inmediato.
+        Devuelve cuántas imágenes se convierten (0 si el blob ya estaba al día)."""
+        self.cerrar()
+        anterior = self._leer_indice()
+        previas = {}
+        fallidas_previas = {}
+        if anterior is not None:
+            previas = {e['rel_path']: (i, e) for i, e in enumerate(anterior['entradas'])}
+            fallidas_previas = {e['rel_path']: e for e in anterior.get('fallidas', [])}
+
+        imagenes = escanear_imagenes(self.carpeta)
+        plan = []       # (imagen, índice del cuadro reutilizable o None)
+        fallidas = []   # imágenes que ya fallaron y no han cambiado: no se reintentan
+        for img in imagenes:
+            stat = os.stat(img['path'])
+            img['mtime_ns'] = stat.st_mtime_ns
+            img['size'] = stat.st_size
+            previa = previas.get(img['rel_path'])
+            fallida = fallidas_previas.get(img['rel_path'])
+            if previa is not None and previa[1]['label'] == img['label']:
+                # Solo se reconvierte si el contenido es distinto
+                i, entrada = previa
+                plan.append((img, i if _mismo_contenido(img, entrada) else None))
+            elif fallida is not None and fallida['label'] == img['label'] and _mismo_contenido(img, fallida):
+                fallidas.append(img)
+            else:
+                img['hash'] = hash_archivo(img['path'])
+                plan.append((img, None))
+
+        convertidas = sum(1 for _, i in plan if i is None)
+        sin_cambios = (anterior is not None and convertidas == 0 and
+                       [i for _, i in plan] == list(range(len(anterior['entradas']))))
+        if sin_cambios:
+            # El blob sigue igual; el índice solo se reescribe si cambiaron fechas o la lista de fallidas
+            fechas = [(img['rel_path'], img['mtime_ns']) for img in [img for img, _ in plan] + fallidas]
+            fechas_previas = [(e['rel_path'], e['mtime_ns']) for e in anterior['entradas'] + anterior.get('fallidas', [])]
+            if fechas != fechas_previas:
+                self._escribir_indice([img for img, _ in plan], fallidas)
+            self.abrir()
+            return 0
+
+        # Mientras se reconstruye, `entradas` crece con cada cuadro escrito en el temporal
+        self.entradas = []
+        self._construyendo = True
+        self._hilo = threading.Thread(target=self._reconstruir, args=(plan, fallidas, procesos, profundidad),
+                                      daemon=True)
+        self._hilo.start()
+        if esperar:
+            self.esperar()
+        return convertidas
+
+    def esperar(self):
+        """Bloquea hasta que termine la reconstrucción en curso (si la hay)."""
+        if self._hilo is not None:
+            self._hilo.join()
+            self._hilo = None
+
+    def _reconstruir(self, plan, fallidas, procesos, profundidad):
+        # Se escribe un blob nuevo en un archivo temporal y se reemplaza al final (os.replace), así una
+        # interrupción nunca deja un blob a medias junto a un índice que no le corresponde.
+        from precarga import PrecargaImagenes
+
+        temporal = self.ruta_blob + '.tmp'
+        nuevas = [img for img, i in plan if i is None]
+        viejo = None
+        try:
+            with open(temporal, 'wb') as salida:
+                if len(nuevas) < len(plan):
+                    viejo = open(self.ruta_blob, 'rb')
+                with self._listo:
+                    self._archivo = open(temporal, 'rb')
+                self._precarga = PrecargaImagenes(nuevas, self.ancho, self.alto, profundidad, procesos)
+                preparadas = iter(self._precarga)
+                for img, i in plan:
+                    if i is not None:
+                        viejo.seek(i * self.tam_cuadro)
+                        datos = viejo.read(self.tam_cuadro)
+                    else:
+                        img, datos = next(preparadas)
+                        if isinstance(datos, Exception):
+                            print(f"Error procesando imagen {img['rel_path']}: {datos}")
+                            fallidas.append(img)
+                            continue
+                    salida.write(datos)
+                    salida.flush()
+                    with self._listo:
+                        self.entradas.append(img)
+                        self._listo.notify_all()
+                for _ in preparadas:   # Cierra el pool
+                    pass
+            with self._listo:
+                # En Windows hay que cerrar el lector del temporal antes de reemplazar el blob
+                self._archivo.close()
+                self._archivo = None
+                os.replace(temporal, self.ruta_blob)
+                self._escribir_indice(self.entradas, fallidas)
+                self._mapear()
+            print(f"Almacén de imágenes: {len(nuevas)} convertidas, {len(plan) - len(nuevas)} reutilizadas, "
+                  f"{len(fallidas)} fallidas")
+        finally:
+            if viejo is not None:
+                viejo.close()
+            if self._precarga is not None:
+                self._precarga.cerrar()
+            with self._listo:
+                self._construyendo = False
+                self._listo.notify_all()
+
+    def _escribir_indice(self, entradas, fallidas=()):
+        campos = ('rel_path', 'name', 'label', 'mtime_ns', 'size', 'hash')
+        indice = {'version': VERSION_INDICE, 'ancho': self.ancho, 'alto': self.alto, 'canales': CANALES,
+                  'entradas': [{k: img[k] for k in campos} for img in entradas],
+                  # Sin cuadro en el blob; se reintentan cuando cambia el archivo
+                  'fallidas': [{k: img[k] for k in campos} for img in fallidas]}
+        temporal = self.ruta_indice + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(indice, f)
+        os.replace(temporal, self.ruta_indice)
+
+    def abrir(self):
+        """Abre el blob y el índice ya construidos (sin revisar la carpeta)."""
+        self.cerrar()
+        indice = self._leer_indice()
+        if indice is None:
+            raise FileNotFoundError(f"No hay un almacén válido en {self.ruta_blob}; llama a actualizar()")
+        self.entradas = [dict(e, path=os.path.join(self.carpeta, *e['rel_path'].split('/')))
+                         for e in indice['entradas']]
+        self._mapear()
+
+    def _mapear(self):
+        if self.entradas:
+            self._archivo = open(self.ruta_blob, 'rb')
+            self._mapa = mmap.mmap(self._archivo.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def cerrar(self):
+        # En Windows un archivo mapeado no se puede reemplazar: siempre se cierra antes de reconstruir
+        self.esperar()
+        if self._mapa is not None:
+            try:
+                self._mapa.close()
+            except BufferError:
+                # Todavía hay cuadros de cuadro() vivos: el mapa se libera solo cuando se suelta el último
+                # (en Windows, hasta entonces no se puede reemplazar el blob)
+                pass
+            self._mapa = None
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+
+    def disponible(self, i):
+        """True si existe el cuadro i. Durante una reconstrucción espera a que se escriba (o a que
+        termine sin él, si la lista resultó más corta)."""
+        with self._listo:
+            if i >= len(self.entradas) and self._construyendo:
+                inicio = time.perf_counter()
+                self._listo.wait_for(lambda: i < len(self.entradas) or not self._construyendo)
+                self.esperas += 1
+                self.tiempo_espera += time.perf_counter() - inicio
+            return i < len(self.entradas)
+
+    def cuadro(self, i):
+        """Rebanada sin copia (memoryview) del cuadro i dentro del blob mapeado. Si el blob todavía se
+        está reconstruyendo, espera al cuadro y devuelve una copia leída del archivo temporal.
+        La rebanada mantiene vivo el mapa: suéltala (release() o sin referencias) antes de actualizar();
+        si sigue viva, cerrar() deja que el mapa se libere con ella."""
+        if not self.disponible(i):
+            raise IndexError(i)
+        with self._listo:
+            if self._mapa is None:
+                self._archivo.seek(i * self.tam_cuadro)
+                return self._archivo.read(self.tam_cuadro)
+        inicio = i * self.tam_cuadro
+        return memoryview(self._mapa)[inicio:inicio + self.tam_cuadro]
+
+    def estadisticas(self):
+        with self._listo:
+            datos = {'construyendo': self._construyendo,
+                     'cuadros': len(self.entradas),
+                     'esperas': self.esperas,
+                     'tiempo_espera_s': round(self.tiempo_espera, 3)}
+        if self._precarga is not None:
+            datos['precarga'] = self._precarga.estadisticas()
+        return datos
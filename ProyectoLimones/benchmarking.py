@@ -1,9 +1,13 @@
 import os
-import csv
 import socket
-from flask import Flask, request, Response
+from flask import Flask, request, Response, jsonify
 from PIL import Image
 
+from almacen_imagenes import AlmacenImagenes, escanear_imagenes
+from despachador import Despachador
+from resultados import EscritorResultados, exportar_columnar
+from indice_resultados import IndiceResultados, COLUMNAS
+
 # --- CONFIGURACIÓN ---
 # Asegúrate de que esta ruta sea correcta
 ROOT_FOLDER = r"C:\Users\PC\Desktop\dataser_sizer-20251110T003551Z-1-001\dataser_sizer" 
@@ -16,10 +20,38 @@ HOST_IP = "0.0.0.0"
 WIDTH = 96
 HEIGHT = 96
 
+# Dataset preprocesado (se genera solo, y se reconstruye solo si cambian las imágenes de ROOT_FOLDER)
+BLOB_FILE = "imagenes_96x96.bin"
+
+# Precarga: mientras el blob se (re)construye, un pool de PRECARGA_PROCESOS procesos prepara hasta
+# PRECARGA_PROFUNDIDAD imágenes por adelantado, y el servidor responde a la ESP32 desde el primer cuadro
+# listo en vez de esperar a que termine todo el dataset. None = un proceso por núcleo.
+PRECARGA_PROFUNDIDAD = 8
+PRECARGA_PROCESOS = None
+
+# Varias ESP32: cada imagen se presta a una placa y viaja con el encabezado X-Image-Id (ida y vuelta).
+# Si la placa no reporta en LEASE_SEGUNDOS, la imagen se le da a otra.
+LEASE_SEGUNDOS = 30
+HEADER_ID = 'X-Image-Id'
+
+# Resultados: se escriben al CSV en lotes desde un hilo. Si el servidor se cae, se pierden como mucho
+# RESULTADOS_MAX_PERDIDAS reportes (o los de los últimos RESULTADOS_INTERVALO segundos).
+# RESULTADOS_COLUMNAR = "resultados_finales.parquet" (o .arrow) genera además una copia columnar al
+# terminar, más rápida de cargar para el análisis (necesita pyarrow).
+RESULTADOS_MAX_PERDIDAS = 100
+RESULTADOS_INTERVALO = 2.0
+RESULTADOS_COLUMNAR = None
+
+# Sesiones retomables: al arrancar se leen los resultados que ya hay y solo se piden las imágenes que
+# faltan o fallaron. False empieza de cero (borra el CSV).
+RETOMAR = True
+
 app = Flask(__name__)
 image_queue = []
-current_index = 0
+almacen = AlmacenImagenes(ROOT_FOLDER, BLOB_FILE, ancho=WIDTH, alto=HEIGHT)
+despachador = None
 results_file = "resultados_finales.csv"
+resultados = None
 
 def get_local_ip():
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -33,93 +65,99 @@ def get_local_ip():
     return IP
 
 def load_images():
-    global image_queue
+    global image_queue, resultados, despachador
     print("--- ESCANEANDO CARPETAS ---")
-    for root, dirs, files in os.walk(ROOT_FOLDER):
-        for filename in files:
-            if filename.lower().endswith(('.png', '.jpg', '.jpeg')):
-                full_path = os.path.join(root, filename)
-                real_label = os.path.basename(root)
-                image_queue.append({'path': full_path, 'name': filename, 'label': real_label})
+    # Recorte, RGBA y redimensión se hacen una sola vez para todo el dataset (ver almacen_imagenes.py),
+    # en segundo plano: /get-next-image solo espera si la ESP32 alcanza a la precarga
+    convertidas = almacen.actualizar(procesos=PRECARGA_PROCESOS, profundidad=PRECARGA_PROFUNDIDAD, esperar=False)
+    image_queue = almacen.entradas
     
-    print(f"Total de imágenes encontradas: {len(image_queue)}")
+    if convertidas:
+        print(f"Preparando {convertidas} imágenes en segundo plano (ver /estadisticas)...")
+    else:
+        print(f"Total de imágenes encontradas: {len(image_queue)}")
     
-    # Preparamos el archivo CSV
-    with open(results_file, mode='w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow(["Archivo", "Etiqueta_REAL", "Prediccion_ESP32", "Detalle_Completo"])
+    # Preparamos el archivo CSV: se sigue agregando al de la sesión anterior y se saltan las imágenes
+    # que ya tienen un resultado válido (indexadas por ruta relativa y etiqueta)
+    indice = None
+    if RETOMAR:
+        indice = IndiceResultados(results_file, escanear_imagenes(almacen.carpeta))
+        if not indice.formato_actual():
+            print(f"Migrando {results_file} al formato con la columna 'Ruta'...")
+            respaldo = indice.reescribir()
+            print(f"El archivo original quedó en {respaldo}")
+        if len(indice):
+            print(f"Sesión retomada: {len(indice)} imágenes ya tienen resultado en {results_file}")
+    resultados = EscritorResultados(results_file, COLUMNAS, max_perdidas=RESULTADOS_MAX_PERDIDAS,
+                                    intervalo=RESULTADOS_INTERVALO, truncar=not RETOMAR)
+    omitir = None
+    if indice is not None and len(indice):
+        omitir = lambda i: indice.hecha(image_queue[i])
+    despachador = Despachador(almacen.disponible, duracion=LEASE_SEGUNDOS, omitir=omitir)
+
+def close_results():
+    # Vacía los reportes que siguen en memoria; se llama al apagar el servidor (Ctrl+C incluido)
+    if resultados is None:
+        return  # load_images() falló antes de abrir el archivo: no hay nada que guardar
+    resultados.cerrar()
+    print(f"Resultados guardados en {results_file}")
+    if RESULTADOS_COLUMNAR:
+        filas = exportar_columnar(results_file, RESULTADOS_COLUMNAR)
+        print(f"Copia columnar: {RESULTADOS_COLUMNAR} ({filas} filas)")
 
 @app.route('/get-next-image', methods=['GET'])
 def get_next_image():
-    global current_index
-    
-    if current_index >= len(image_queue):
-        return "DONE", 204 
+    image_id = despachador.asignar(request.remote_addr)
+    if image_id is None:
+        if despachador.terminado():
+            return "DONE", 204 
+        # Quedan imágenes prestadas a otras placas: si alguna vence, se reasigna a quien vuelva a pedir
+        return "ESPERA", 503, {'Retry-After': '2'}
 
-    img_info = image_queue[current_index]
-    print(f"[{current_index+1}/{len(image_queue)}] Procesando: {img_info['name']}...")
+    img_info = image_queue[image_id]
+    print(f"[{image_id+1}/{len(image_queue)}] {request.remote_addr} -> {img_info['name']}...")
     
-    try:
-        # 1. Abrir imagen original
-        img = Image.open(img_info['path'])
-        
-        # --- NUEVA ESTRATEGIA: RECORTE CENTRAL (CROP) ---
-        # En lugar de rotar o aplastar, cortamos un cuadrado del centro.
-        # Esto mantiene la forma REAL del limón (sin hacerlo gordo ni flaco).
-        
-        w, h = img.size
-        min_dim = min(w, h) # Tomamos el lado más corto
-        
-        # Calculamos las coordenadas para cortar justo el centro
-        left = (w - min_dim) / 2
-        top = (h - min_dim) / 2
-        right = (w + min_dim) / 2
-        bottom = (h + min_dim) / 2
-        
-        # Cortamos
-        img = img.crop((left, top, right, bottom))
-        
-        # 2. CONVERTIR A RGBA (Obligatorio para ESP32)
-        img = img.convert('RGBA')
-        
-        # 3. REDIMENSIONAR A 96x96
-        # Ahora que la imagen ya es cuadrada por el corte, 
-        # al reducirla NO se deforma.
-        img = img.resize((WIDTH, HEIGHT), Image.Resampling.LANCZOS)
-        
-        # --- DEBUG VISUAL ---
-        if current_index == 0: 
-            img.save("test_debug_lo_que_ve_la_esp32.png")
-            print(">> REVISA 'test_debug_lo_que_ve_la_esp32.png'.")
-            print(">> El limón debe verse con su FORMA NATURAL (no aplastado).")
-
-        raw_data = img.tobytes()
-        return Response(raw_data, mimetype='application/octet-stream')
-        
-    except Exception as e:
-        print(f"Error procesando imagen: {e}")
-        current_index += 1
-        return "ERROR", 500
+    # El cuadro ya está preprocesado en el blob: se lee la rebanada del mmap, sin usar PIL
+    # (o, en la primera pasada, el cuadro que dejó listo la precarga).
+    # Se copia a bytes: el servidor de Werkzeug solo acepta bytes en el cuerpo, no un memoryview
+    raw_data = bytes(almacen.cuadro(image_id))
+
+    # --- DEBUG VISUAL ---
+    if image_id == 0: 
+        Image.frombuffer('RGBA', (WIDTH, HEIGHT), raw_data, 'raw', 'RGBA', 0, 1).save("test_debug_lo_que_ve_la_esp32.png")
+        print(">> REVISA 'test_debug_lo_que_ve_la_esp32.png'.")
+        print(">> El limón debe verse con su FORMA NATURAL (no aplastado).")
+
+    return Response([raw_data], mimetype='application/octet-stream',
+                    headers={'Content-Length': str(len(raw_data)), HEADER_ID: str(image_id)})
     
 @app.route('/report-result', methods=['POST'])
 def report_result():
-    global current_index
-    
+    # El reporte se asocia a la imagen por su ID, no por el orden de llegada
+    try:
+        image_id = int(request.headers[HEADER_ID])
+    except (KeyError, ValueError):
+        return f"Falta el encabezado {HEADER_ID}", 400
+    if not 0 <= image_id < len(image_queue):
+        return "ID desconocido", 400
+
     prediction_text = request.data.decode('utf-8')
+    if not despachador.completar(image_id):
+        print(f" -> Reporte repetido de la imagen {image_id}, se ignora")
+        return "DUPLICADO", 200
+
+    img_info = image_queue[image_id]
+    clean_pred = prediction_text.replace("\n", " | ")
+    print(f" -> [{image_id+1}] Resultado: {clean_pred[:50]}...")
     
-    if current_index < len(image_queue):
-        img_info = image_queue[current_index]
-        
-        clean_pred = prediction_text.replace("\n", " | ")
-        print(f" -> Resultado: {clean_pred[:50]}...")
-        
-        with open(results_file, mode='a', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow([img_info['name'], img_info['label'], clean_pred, prediction_text])
-            
-        current_index += 1
-        return "OK", 200
-    return "DONE", 200
+    resultados.agregar([img_info['name'], img_info['label'], clean_pred, prediction_text, img_info['rel_path']])
+    return "OK", 200
+
+@app.route('/estadisticas', methods=['GET'])
+def estadisticas():
+    # Nivel de la cola de precarga, tiempo que las ESP32 pasaron esperando cuadros, y préstamos
+    return jsonify(dict(almacen.estadisticas(), despacho=despachador.estadisticas(),
+                        resultados=resultados.estadisticas()))
 
 if __name__ == '__main__':
     load_images()
@@ -127,4 +165,7 @@ if __name__ == '__main__':
     print(f"\n=============================================")
     print(f" COPIA ESTA IP EN TU CÓDIGO ARDUINO: {mi_ip}")
     print(f"=============================================\n")
-    app.run(host=HOST_IP, port=PORT)
\ No newline at end of file
+    try:
+        app.run(host=HOST_IP, port=PORT, threaded=True)
+    finally:
+        close_results()
\ No newline at end of file
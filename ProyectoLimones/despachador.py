@@ -0,0 +1,110 @@
+import time
+import threading
+from collections import deque, Counter
+
+# --- DESPACHADOR DE IMÁGENES PARA VARIAS ESP32 ---
+# Cada petición de imagen recibe un "préstamo" (lease) sobre un ID concreto (el índice del cuadro en el
+# almacén). El reporte trae de vuelta ese ID, así que ya no importa el orden en que lleguen los reportes
+# ni cuántas placas estén trabajando a la vez. Si una placa no reporta antes de que venza su préstamo
+# (se reinició, perdió el WiFi...), la imagen vuelve a la cola para que la tome otra.
+
+
+class Despachador:
+    """Cola de trabajo con préstamos que vencen. Todos los métodos son seguros entre hilos."""
+
+    def __init__(self, existe, duracion=30.0, reloj=time.monotonic, omitir=None):
+        """
+        existe: función existe(i) -> bool que dice si hay imagen i (puede esperar a que se prepare,
+                como AlmacenImagenes.disponible)
+        duracion: segundos que una placa tiene para reportar una imagen antes de que se reasigne
+        omitir: función omitir(i) -> bool para las imágenes que ya tienen resultado (sesión retomada);
+                se cuentan como reportadas sin prestarse
+        """
+        self._existe = existe
+        self._omitir = omitir
+        self.duracion = duracion
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        self._siguiente = 0          # próximo ID que nunca se ha prestado
+        self._total = None           # se conoce cuando existe() dice que no hay más
+        self._reasignar = deque()    # IDs cuyo préstamo venció, se prestan antes que los nuevos
+        self._prestamos = {}         # ID -> (dispositivo, vencimiento)
+        self._hechos = set()
+        self.vencidos = 0
+        self.omitidas = 0
+        self.por_dispositivo = Counter()
+
+    def _recuperar_vencidos(self):
+        ahora = self._reloj()
+        for i in [i for i, (_, vence) in self._prestamos.items() if vence <= ahora]:
+            del self._prestamos[i]
+            self._reasignar.append(i)
+            self.vencidos += 1
+
+    def asignar(self, dispositivo):
+        """Presta una imagen al dispositivo. Devuelve su ID, o None si por ahora no hay nada que
+        prestar (ver terminado() para saber si ya no habrá más)."""
+        with self._lock:
+            self._recuperar_vencidos()
+            vence = self._reloj() + self.duracion
+            if self._reasignar:
+                i = self._reasignar.popleft()
+                self._prestamos[i] = (dispositivo, vence)
+                self.por_dispositivo[dispositivo] += 1
+                return i
+            while True:
+                if self._total is not None and self._siguiente >= self._total:
+                    return None
+                i = self._siguiente
+                self._siguiente += 1
+                self._prestamos[i] = (dispositivo, vence)
+                # Fuera del candado: existe() puede bloquear mientras el almacén se sigue construyendo
+                self._lock.release()
+                try:
+                    existe = self._existe(i)
+                    omitir = existe and self._omitir is not None and self._omitir(i)
+                finally:
+                    self._lock.acquire()
+                if not existe:
+                    self._prestamos.pop(i, None)
+                    self._total = i if self._total is None else min(self._total, i)
+                    return None
+                if omitir:
+                    self._prestamos.pop(i, None)
+                    self._hechos.add(i)
+                    self.omitidas += 1
+                    continue
+                self.por_dispositivo[dispositivo] += 1
+                return i
+
+    def completar(self, i):
+        """Registra el reporte de la imagen i. Devuelve False si ya estaba reportada (reintento o
+        préstamo vencido que otra placa ya terminó) o si nunca se prestó; en ese caso se ignora."""
+        with self._lock:
+            if i in self._hechos or i >= self._siguiente or i < 0:
+                return False
+            if self._prestamos.pop(i, None) is None:
+                # Llegó tarde, después de vencer: se acepta igual si nadie la ha terminado
+                try:
+                    self._reasignar.remove(i)
+                except ValueError:
+                    pass
+            self._hechos.add(i)
+            return True
+
+    def terminado(self):
+        """True cuando todas las imágenes están reportadas."""
+        with self._lock:
+            return (self._total is not None and self._siguiente >= self._total and
+                    not self._prestamos and not self._reasignar)
+
+    def estadisticas(self):
+        with self._lock:
+            self._recuperar_vencidos()
+            return {'reportadas': len(self._hechos),
+                    'omitidas': self.omitidas,
+                    'prestadas': len(self._prestamos),
+                    'por_reasignar': len(self._reasignar),
+                    'vencidas': self.vencidos,
+                    'total': self._total,
+                    'por_dispositivo': dict(self.por_dispositivo)}
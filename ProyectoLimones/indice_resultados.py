@@ -0,0 +1,110 @@
+import os
+import csv
+import shutil
+
+# --- ÍNDICE DEL ARCHIVO DE RESULTADOS ---
+# Carga resultados_finales.csv en un diccionario (ruta relativa, etiqueta) -> última fila reportada.
+# Con él, el servidor retoma una corrida interrumpida encolando solo las imágenes que faltan o fallaron,
+# y verificar_faltantes.py saca su reporte de la misma fuente.
+
+COLUMNAS = ["Archivo", "Etiqueta_REAL", "Prediccion_ESP32", "Detalle_Completo", "Ruta"]
+
+
+def clave(img):
+    return (img['rel_path'], img['label'])
+
+
+def es_fallo(prediccion):
+    """La ESP32 reporta 'Error de inferencia' cuando run_classifier falla; tampoco cuenta un reporte vacío."""
+    return not prediccion.strip() or prediccion.startswith('Error')
+
+
+class IndiceResultados:
+    """Última fila de cada imagen en el CSV de resultados."""
+
+    def __init__(self, ruta_csv, imagenes=()):
+        """
+        imagenes: las del dataset (escanear_imagenes), para encontrar la ruta de las filas de los CSV
+                  anteriores, que solo guardaban nombre y etiqueta
+        """
+        self.ruta_csv = ruta_csv
+        self.filas = {}          # (rel_path, label) -> fila como dict
+        self.sin_ruta = []       # filas anteriores cuya ruta no se pudo deducir (se conservan tal cual)
+        self.todas = []          # todas las filas del archivo, en orden (para reescribir() sin perder ninguna)
+        self.encabezado = None   # el del archivo tal como está (None si no existe)
+        self.cargar(imagenes)
+
+    def cargar(self, imagenes=()):
+        # (nombre, etiqueta) -> rutas relativas; si hay más de una, la fila anterior es ambigua
+        rutas = {}
+        for img in imagenes:
+            rutas.setdefault((img['name'], img['label']), []).append(img['rel_path'])
+        self.filas = {}
+        self.sin_ruta = []
+        self.todas = []
+        self.encabezado = None
+        try:
+            f = open(self.ruta_csv, newline='', encoding='utf-8')
+        except FileNotFoundError:
+            return self
+        with f:
+            reader = csv.DictReader(f)
+            self.encabezado = reader.fieldnames
+            for fila in reader:
+                self.todas.append(fila)
+                if not fila.get('Archivo'):
+                    continue
+                ruta = fila.get('Ruta')
+                if not ruta:
+                    # Los CSV anteriores no guardaban la ruta: se busca la imagen por nombre y etiqueta
+                    candidatas = rutas.get((fila['Archivo'], fila['Etiqueta_REAL']), [])
+                    if len(candidatas) != 1:
+                        fila['Ruta'] = ''
+                        self.sin_ruta.append(fila)
+                        continue
+                    ruta = candidatas[0]
+                fila['Ruta'] = ruta
+                previa = self.filas.get((ruta, fila['Etiqueta_REAL']))
+                # Un reintento exitoso reemplaza a un fallo, pero un fallo no borra un resultado bueno
+                if previa is None or es_fallo(previa['Prediccion_ESP32']) or not es_fallo(fila['Prediccion_ESP32']):
+                    self.filas[(ruta, fila['Etiqueta_REAL'])] = fila
+        return self
+
+    def __len__(self):
+        return len(self.filas)
+
+    def hecha(self, img):
+        """True si la imagen ya tiene un resultado válido."""
+        fila = self.filas.get(clave(img))
+        return fila is not None and not es_fallo(fila['Prediccion_ESP32'])
+
+    def faltantes(self, imagenes):
+        """Las imágenes sin resultado válido, separadas en (nunca reportadas, con reporte fallido)."""
+        sin_reporte, fallidas = [], []
+        for img in imagenes:
+            fila = self.filas.get(clave(img))
+            if fila is None:
+                sin_reporte.append(img)
+            elif es_fallo(fila['Prediccion_ESP32']):
+                fallidas.append(img)
+        return sin_reporte, fallidas
+
+    def formato_actual(self):
+        return self.encabezado is None or self.encabezado == COLUMNAS
+
+    def reescribir(self):
+        """Migra el CSV de una versión anterior a las columnas actuales, para poder seguir agregando
+        filas. Se conservan TODAS las filas, en el mismo orden (también los reintentos y los fallos), con
+        la columna Ruta llena donde se pudo deducir; las demás la dejan vacía y se vuelven a buscar la
+        próxima vez que se cargue el archivo. El original se guarda antes en <archivo>.bak, y el CSV se
+        reemplaza de forma atómica. Devuelve la ruta de la copia."""
+        respaldo = self.ruta_csv + '.bak'
+        shutil.copy2(self.ruta_csv, respaldo)
+        temporal = self.ruta_csv + '.tmp'
+        with open(temporal, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, COLUMNAS, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(self.todas)
+        os.replace(temporal, self.ruta_csv)
+        self.encabezado = list(COLUMNAS)
+        return respaldo
@@ -0,0 +1,98 @@
+import time
+import threading
+from multiprocessing import Pool
+
+from almacen_imagenes import preparar_imagen
+
+# --- PRECARGA DE IMÁGENES EN PARALELO ---
+# Un pool de procesos recorta, convierte y redimensiona las imágenes POR ADELANTADO: siempre hay hasta
+# `profundidad` imágenes en vuelo por delante de la que se está consumiendo, y los cuadros se entregan
+# en el mismo orden de la lista. La cola es acotada, así que la memoria no crece con el tamaño del dataset.
+
+
+def _preparar(args):
+    ruta, ancho, alto = args
+    return preparar_imagen(ruta, ancho, alto)
+
+
+class PrecargaImagenes:
+    """Iterador de (imagen, bytes del cuadro o la excepción que dio al prepararla), en orden."""
+
+    def __init__(self, imagenes, ancho, alto, profundidad=8, procesos=None):
+        """
+        imagenes: lista de dicts con 'path' (como las de escanear_imagenes)
+        profundidad: cuántas imágenes se preparan por delante de la que se consume
+        procesos: tamaño del pool (None = un proceso por núcleo)
+        """
+        if profundidad < 1:
+            raise ValueError("La profundidad de la precarga debe ser al menos 1")
+        self.imagenes = imagenes
+        self.ancho = ancho
+        self.alto = alto
+        self.profundidad = profundidad
+        self.procesos = procesos
+        self._pool = None
+        self._en_vuelo = {}      # índice -> AsyncResult
+        self._siguiente = 0      # próximo índice que se manda al pool
+        self._lock = threading.Lock()
+        # Estadísticas: cuántas veces el consumidor tuvo que esperar a los procesos, y cuánto en total
+        self.entregadas = 0
+        self.esperas = 0
+        self.tiempo_espera = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def _llenar(self, hasta):
+        while self._siguiente < min(hasta, len(self.imagenes)):
+            img = self.imagenes[self._siguiente]
+            self._en_vuelo[self._siguiente] = self._pool.apply_async(_preparar, ((img['path'], self.ancho, self.alto),))
+            self._siguiente += 1
+
+    def __iter__(self):
+        if self.imagenes and self._pool is None:
+            self._pool = Pool(self.procesos)
+        for i, img in enumerate(self.imagenes):
+            with self._lock:
+                self._llenar(i + self.profundidad)
+                resultado = self._en_vuelo.pop(i)
+            if not resultado.ready():
+                inicio = time.perf_counter()
+                resultado.wait()
+                self.esperas += 1
+                self.tiempo_espera += time.perf_counter() - inicio
+            try:
+                datos = resultado.get()
+            except Exception as e:
+                datos = e
+            self.entregadas += 1
+            yield img, datos
+        self.cerrar()
+
+    def nivel(self):
+        """Cuántos cuadros de la cola ya están listos esperando a ser consumidos."""
+        with self._lock:
+            return sum(1 for r in self._en_vuelo.values() if r.ready())
+
+    def estadisticas(self):
+        with self._lock:
+            en_vuelo = len(self._en_vuelo)
+        return {'profundidad': self.profundidad,
+                'procesos': self.procesos,
+                'en_cola': en_vuelo,
+                'listos': self.nivel(),
+                'entregadas': self.entregadas,
+                'total': len(self.imagenes),
+                'esperas': self.esperas,
+                'tiempo_espera_s': round(self.tiempo_espera, 3)}
+
+    def cerrar(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+        with self._lock:
+            self._en_vuelo.clear()
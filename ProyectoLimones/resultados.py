@@ -0,0 +1,149 @@
+import os
+import csv
+import threading
+
+# --- ESCRITOR DE RESULTADOS EN LOTES ---
+# Los reportes de las ESP32 se acumulan en memoria y un hilo los escribe al CSV en lotes (cada
+# `intervalo` segundos, o antes si se juntan `max_perdidas` filas). El archivo queda abierto toda la
+# sesión, en lugar de abrir, escribir una fila y cerrar por cada reporte.
+# Nunca hay más de `max_perdidas` filas sin escribir: si se llena el búfer, agregar() espera al hilo.
+# Así, si el proceso se cae, como mucho se pierden esas filas (y se vuelven a pedir en la siguiente sesión).
+# Si el hilo falla al escribir (disco lleno, archivo cerrado...), el error se guarda y agregar() y cerrar()
+# lo vuelven a lanzar, en lugar de quedarse esperando a un hilo que ya no existe.
+
+
+class EscritorResultados:
+    """Sumidero de filas para el CSV de resultados, con un hilo escritor."""
+
+    def __init__(self, ruta, encabezado, max_perdidas=100, intervalo=1.0, truncar=True, sincronizar=False):
+        """
+        ruta: archivo CSV de salida
+        encabezado: nombres de las columnas (se escriben si el archivo está vacío)
+        max_perdidas: máximo de filas en memoria sin escribir (lo que se puede perder en una caída)
+        intervalo: segundos máximos que una fila espera en memoria
+        truncar: True empieza el archivo de cero, False agrega al final
+        sincronizar: además de vaciar el búfer de Python, fuerza la escritura al disco (os.fsync) en cada
+                     lote; protege también contra cortes de luz, a cambio de más latencia por lote
+        """
+        if max_perdidas < 1:
+            raise ValueError("max_perdidas debe ser al menos 1")
+        self.ruta = ruta
+        self.encabezado = list(encabezado)
+        self.max_perdidas = max_perdidas
+        self.intervalo = intervalo
+        self.sincronizar = sincronizar
+        self.filas_escritas = 0
+        self.lotes = 0
+
+        self._archivo = open(ruta, mode='w' if truncar else 'a', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._archivo)
+        if self._archivo.tell() == 0:
+            self._writer.writerow(self.encabezado)
+            self._archivo.flush()
+
+        self._pendientes = []
+        self._cerrado = False
+        self._error = None
+        self._cambio = threading.Condition()
+        self._hilo = threading.Thread(target=self._escribir, daemon=True)
+        self._hilo.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def agregar(self, fila):
+        """Encola una fila. Solo bloquea si ya hay max_perdidas filas sin escribir."""
+        with self._cambio:
+            self._cambio.wait_for(lambda: len(self._pendientes) < self.max_perdidas or
+                                  self._cerrado or self._error is not None)
+            # Se revisa después de esperar: cerrar() o un error pudieron llegar mientras tanto
+            if self._error is not None:
+                raise self._error
+            if self._cerrado:
+                raise ValueError("El escritor de resultados ya está cerrado")
+            self._pendientes.append(fila)
+            if len(self._pendientes) >= self.max_perdidas:
+                self._cambio.notify_all()
+
+    def _escribir(self):
+        while True:
+            with self._cambio:
+                self._cambio.wait_for(lambda: self._cerrado or len(self._pendientes) >= self.max_perdidas,
+                                      timeout=self.intervalo)
+                terminar = self._cerrado
+                lote = list(self._pendientes)
+            # Se escribe fuera del candado para que los reportes nuevos no esperen al disco; las filas del
+            # lote siguen contando como pendientes hasta que estén en el archivo
+            if lote:
+                try:
+                    self._writer.writerows(lote)
+                    self._archivo.flush()
+                    if self.sincronizar:
+                        os.fsync(self._archivo.fileno())
+                except Exception as e:
+                    with self._cambio:
+                        self._error = e
+                        self._cambio.notify_all()
+                    return
+                with self._cambio:
+                    del self._pendientes[:len(lote)]
+                    self.filas_escritas += len(lote)
+                    self.lotes += 1
+                    self._cambio.notify_all()
+            if terminar and not lote:
+                return
+
+    def cerrar(self):
+        """Escribe todo lo pendiente y cierra el archivo. Se puede llamar más de una vez.
+        Si el hilo no pudo escribir, lanza ese error (las filas pendientes no llegaron al archivo)."""
+        with self._cambio:
+            cerrado = self._cerrado
+            self._cerrado = True
+            self._cambio.notify_all()
+        if not cerrado:
+            self._hilo.join()
+            try:
+                self._archivo.close()
+            except OSError as e:
+                if self._error is None:
+                    self._error = e
+        if self._error is not None:
+            raise self._error
+
+    def estadisticas(self):
+        with self._cambio:
+            return {'filas_escritas': self.filas_escritas,
+                    'lotes': self.lotes,
+                    'pendientes': len(self._pendientes),
+                    'error': None if self._error is None else str(self._error),
+                    'max_perdidas': self.max_perdidas}
+
+
+def exportar_columnar(ruta_csv, ruta_salida):
+    """Convierte el CSV de resultados a Parquet (.parquet) o Arrow IPC (.arrow / .feather), que se
+    cargan mucho más rápido para el análisis. Todas las columnas quedan como texto, igual que en el CSV.
+    Requiere pyarrow (pip install pyarrow); solo se importa si se usa."""
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+    except ImportError as e:
+        raise ImportError("La salida columnar necesita pyarrow: pip install pyarrow") from e
+
+    with open(ruta_csv, newline='', encoding='utf-8') as f:
+        columnas = next(csv.reader(f))
+    # Detalle_Completo trae saltos de línea dentro de las comillas
+    tabla = pa_csv.read_csv(ruta_csv, parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+                            convert_options=pa_csv.ConvertOptions(column_types={c: pa.string() for c in columnas}))
+
+    if ruta_salida.lower().endswith('.parquet'):
+        import pyarrow.parquet as pq
+        pq.write_table(tabla, ruta_salida)
+    elif ruta_salida.lower().endswith(('.arrow', '.feather')):
+        import pyarrow.feather as feather
+        feather.write_feather(tabla, ruta_salida)
+    else:
+        raise ValueError(f"Formato columnar desconocido: {ruta_salida} (usa .parquet, .arrow o .feather)")
+    return tabla.num_rows
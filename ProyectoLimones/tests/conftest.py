@@ -0,0 +1,19 @@
+import os
+import sys
+
+from PIL import Image
+import pytest
+
+# Los módulos del proyecto viven en la carpeta de arriba (se importan como scripts sueltos)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    """Carpeta con imágenes pequeñas en dos etiquetas, como la del dataset real."""
+    carpeta = tmp_path / "dataset"
+    for etiqueta, color in (("maduro", (200, 180, 20)), ("verde", (40, 160, 40))):
+        (carpeta / etiqueta).mkdir(parents=True)
+        for n in range(3):
+            Image.new('RGB', (64 + 8 * n, 48), color).save(carpeta / etiqueta / f"limon_{n}.jpg")
+    return carpeta
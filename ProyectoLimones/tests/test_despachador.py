@@ -0,0 +1,68 @@
+from despachador import Despachador
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 0.0
+
+    def __call__(self):
+        return self.ahora
+
+
+def _despachador(total, **kwargs):
+    reloj = Reloj()
+    return Despachador(lambda i: i < total, duracion=10, reloj=reloj, **kwargs), reloj
+
+
+def test_reparte_cada_imagen_una_vez():
+    d, _ = _despachador(3)
+    assert [d.asignar('a'), d.asignar('b'), d.asignar('a')] == [0, 1, 2]
+    assert d.asignar('b') is None
+    assert not d.terminado()
+    for i in (2, 0, 1):   # el orden de los reportes no importa
+        assert d.completar(i)
+    assert d.terminado()
+    assert d.estadisticas()['por_dispositivo'] == {'a': 2, 'b': 1}
+
+
+def test_prestamo_vencido_se_reasigna():
+    d, reloj = _despachador(2)
+    assert d.asignar('a') == 0
+    assert d.asignar('a') == 1
+    reloj.ahora = 9.9
+    assert d.asignar('b') is None
+    reloj.ahora = 10.0
+    # La imagen 0 venció: se le da a otra placa antes que cualquier imagen nueva
+    assert d.asignar('b') == 0
+    assert d.estadisticas()['vencidas'] == 2
+    assert d.asignar('c') == 1
+    assert d.completar(0) and d.completar(1)
+    assert d.terminado()
+
+
+def test_reporte_tardio_y_duplicados():
+    d, reloj = _despachador(2)
+    assert d.asignar('a') == 0
+    reloj.ahora = 20.0
+    d.estadisticas()  # vence el préstamo y la imagen vuelve a la cola
+    # La placa lenta reporta después del vencimiento: se acepta y la imagen sale de la cola
+    assert d.completar(0)
+    assert not d.completar(0)      # reintento del mismo reporte
+    assert not d.completar(5)      # nunca se prestó
+    assert not d.completar(-1)
+    assert d.asignar('b') == 1     # no se vuelve a prestar la 0
+    reloj.ahora = 40.0
+    assert d.asignar('c') == 1     # venció en b
+    assert d.completar(1)
+    assert not d.completar(1)      # b reporta tarde lo que c ya terminó
+    assert d.asignar('b') is None
+    assert d.terminado()
+
+
+def test_omite_las_que_ya_tienen_resultado():
+    d, _ = _despachador(5, omitir=lambda i: i % 2 == 0)
+    assert [d.asignar('a'), d.asignar('a'), d.asignar('a')] == [1, 3, None]
+    assert not d.completar(0)      # ya contaba como reportada
+    assert d.completar(1) and d.completar(3)
+    assert d.terminado()
+    assert d.estadisticas()['omitidas'] == 3
@@ -0,0 +1,68 @@
+import csv
+
+from almacen_imagenes import escanear_imagenes
+from indice_resultados import IndiceResultados, COLUMNAS
+
+
+def _escribir(ruta, encabezado, filas):
+    with open(ruta, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(encabezado)
+        writer.writerows(filas)
+
+
+def _leer(ruta):
+    with open(ruta, newline='', encoding='utf-8') as f:
+        return list(csv.reader(f))
+
+
+def test_retoma_solo_faltantes_y_fallidas(dataset, tmp_path):
+    imagenes = escanear_imagenes(str(dataset))
+    ruta = tmp_path / "resultados.csv"
+    a, b, c = imagenes[:3]
+    _escribir(ruta, COLUMNAS, [
+        [a['name'], a['label'], "maduro 0.9", "", a['rel_path']],
+        [b['name'], b['label'], "Error de inferencia", "", b['rel_path']],
+        # Un reintento exitoso reemplaza al fallo, pero un fallo posterior no borra el resultado bueno
+        [c['name'], c['label'], "Error de inferencia", "", c['rel_path']],
+        [c['name'], c['label'], "verde 0.8", "", c['rel_path']],
+        [c['name'], c['label'], "", "", c['rel_path']],
+    ])
+    indice = IndiceResultados(str(ruta), imagenes)
+    assert indice.formato_actual()
+    assert indice.hecha(a) and not indice.hecha(b) and indice.hecha(c)
+    sin_reporte, fallidas = indice.faltantes(imagenes)
+    assert fallidas == [b]
+    assert sin_reporte == imagenes[3:]
+
+
+def test_migra_csv_anterior_sin_perder_filas(dataset, tmp_path):
+    imagenes = escanear_imagenes(str(dataset))
+    ruta = tmp_path / "resultados.csv"
+    a, b = imagenes[0], imagenes[1]
+    anteriores = [
+        [a['name'], a['label'], "Error de inferencia", "x"],
+        [a['name'], a['label'], "maduro 0.9", "x"],
+        [b['name'], b['label'], "verde 0.7", "x"],
+        ["borrada.jpg", a['label'], "verde 0.6", "x"],     # ya no está en el dataset: ruta desconocida
+    ]
+    _escribir(ruta, COLUMNAS[:4], anteriores)
+    original = ruta.read_bytes()
+
+    indice = IndiceResultados(str(ruta), imagenes)
+    assert not indice.formato_actual()
+    assert indice.hecha(a) and indice.hecha(b)
+    assert len(indice.sin_ruta) == 1
+
+    respaldo = indice.reescribir()
+    assert open(respaldo, 'rb').read() == original
+    filas = _leer(ruta)
+    assert filas[0] == COLUMNAS
+    # Todas las filas, en orden, con la ruta deducida donde se pudo
+    assert filas[1:] == [anteriores[0] + [a['rel_path']], anteriores[1] + [a['rel_path']],
+                         anteriores[2] + [b['rel_path']], anteriores[3] + [""]]
+
+    recargado = IndiceResultados(str(ruta), imagenes)
+    assert recargado.formato_actual()
+    assert recargado.hecha(a) and recargado.hecha(b)
+    assert not recargado.hecha(imagenes[2])
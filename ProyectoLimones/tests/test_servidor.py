@@ -0,0 +1,56 @@
+import threading
+import urllib.request
+
+import pytest
+from werkzeug.serving import make_server
+
+import benchmarking
+from almacen_imagenes import AlmacenImagenes
+
+
+@pytest.fixture
+def servidor(dataset, tmp_path, monkeypatch):
+    # El cuadro 0 deja una imagen de depuración en la carpeta actual
+    monkeypatch.chdir(tmp_path)
+    almacen = AlmacenImagenes(str(dataset), str(tmp_path / "blob.bin"), ancho=benchmarking.WIDTH,
+                              alto=benchmarking.HEIGHT)
+    monkeypatch.setattr(benchmarking, 'almacen', almacen)
+    monkeypatch.setattr(benchmarking, 'results_file', str(tmp_path / "resultados.csv"))
+    monkeypatch.setattr(benchmarking, 'PRECARGA_PROCESOS', 1)
+    benchmarking.load_images()
+    # Con el blob ya mapeado, cuadro() devuelve un memoryview (el caso que rompía el servidor)
+    almacen.esperar()
+    # Servidor de desarrollo de Werkzeug real, no el cliente de pruebas de Flask: es el que exige bytes
+    srv = make_server('127.0.0.1', 0, benchmarking.app, threaded=True)
+    hilo = threading.Thread(target=srv.serve_forever, daemon=True)
+    hilo.start()
+    yield f"http://127.0.0.1:{srv.server_port}"
+    srv.shutdown()
+    hilo.join()
+    benchmarking.close_results()
+    almacen.cerrar()
+
+
+def test_cuadro_completo_desde_el_mmap(servidor):
+    tam = benchmarking.WIDTH * benchmarking.HEIGHT * 4
+    recibidos = {}
+    while True:
+        with urllib.request.urlopen(servidor + "/get-next-image") as r:
+            if r.status == 204:
+                break
+            image_id = int(r.headers[benchmarking.HEADER_ID])
+            cuerpo = r.read()
+        assert len(cuerpo) == tam
+        assert cuerpo == bytes(benchmarking.almacen.cuadro(image_id))
+        recibidos[image_id] = cuerpo
+        reporte = urllib.request.Request(servidor + "/report-result", data=b"maduro: 0.9", method='POST',
+                                         headers={benchmarking.HEADER_ID: str(image_id)})
+        with urllib.request.urlopen(reporte) as r:
+            assert r.read() == b"OK"
+    assert sorted(recibidos) == list(range(len(benchmarking.image_queue)))
+
+
+def test_cerrar_sin_resultados(monkeypatch):
+    # load_images() falló antes de crear el escritor: cerrar al salir no debe tapar ese error
+    monkeypatch.setattr(benchmarking, 'resultados', None)
+    benchmarking.close_results()
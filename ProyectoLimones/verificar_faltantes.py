@@ -1,68 +1,55 @@
 import os
-import csv
+
+from almacen_imagenes import escanear_imagenes
+from indice_resultados import IndiceResultados
 
 # --- CONFIGURACIÓN ---
-# Pega aquí la ruta EXACTA de la carpeta "Desecho_95" (o la que quieras revisar)
+# Pega aquí la ruta EXACTA del dataset (la misma ROOT_FOLDER de benchmarking.py)
 CARPETA_A_REVISAR = r"C:\Users\PC\Desktop\dataser_sizer-20251110T003551Z-1-001\dataser_sizer"
+# Para revisar solo una subcarpeta (por ejemplo "Desecho_95"); None = todo el dataset
+SUBCARPETA = None
 
 # El nombre de tu archivo de resultados
 ARCHIVO_CSV = "resultados_finales.csv"
 
 def encontrar_faltantes():
-    print(f"--- ANALIZANDO: {os.path.basename(CARPETA_A_REVISAR)} ---")
-    
-    # 1. Obtener lista de archivos REALES en la carpeta
-    archivos_en_carpeta = set()
-    total_archivos_sistema = 0
+    print(f"--- ANALIZANDO: {SUBCARPETA or os.path.basename(CARPETA_A_REVISAR)} ---")
     
+    # 1. Obtener lista de imágenes REALES (ruta relativa + etiqueta, igual que el servidor)
     if not os.path.exists(CARPETA_A_REVISAR):
         print("¡ERROR! La ruta de la carpeta no existe. Revísala.")
         return
 
-    for filename in os.listdir(CARPETA_A_REVISAR):
-        total_archivos_sistema += 1
-        # Solo nos importan las imagenes
-        if filename.lower().endswith(('.jpg', '.jpeg', '.png')):
-            archivos_en_carpeta.add(filename)
-    
-    print(f"Total objetos en carpeta (Windows): {total_archivos_sistema}")
-    print(f"Total imágenes válidas detectadas: {len(archivos_en_carpeta)}")
+    imagenes = escanear_imagenes(CARPETA_A_REVISAR)
+    todas = imagenes
+    if SUBCARPETA:
+        prefijo = SUBCARPETA.strip('/\\').replace('\\', '/') + '/'
+        imagenes = [img for img in imagenes if img['rel_path'].startswith(prefijo)]
+    print(f"Total imágenes válidas detectadas: {len(imagenes)}")
 
-    # 2. Obtener lista de archivos PROCESADOS en el CSV
-    archivos_en_csv = set()
-    try:
-        with open(ARCHIVO_CSV, mode='r', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            next(reader, None) # Saltar cabecera
-            for row in reader:
-                if row and len(row) > 0:
-                    # La columna 0 tiene el nombre del archivo
-                    archivos_en_csv.add(row[0])
-    except FileNotFoundError:
+    # 2. Cargar el índice de resultados (el mismo con el que el servidor retoma las sesiones)
+    if not os.path.exists(ARCHIVO_CSV):
         print("¡ERROR! No encuentro el archivo .csv")
         return
+    indice = IndiceResultados(ARCHIVO_CSV, todas)
 
-    # 3. Comparar (Matemáticas de conjuntos)
-    # Faltantes = Lo que hay en carpeta MENOS lo que hay en CSV
-    # (Pero solo comparamos los nombres que coinciden con la carpeta actual)
-    
-    # Filtramos el CSV para ver solo los que deberían estar en esta carpeta
-    # (Asumiendo que los nombres son únicos o buscando intersección)
-    faltantes = archivos_en_carpeta - archivos_en_csv
+    # 3. Comparar: faltan las que no tienen fila, y las que solo tienen reportes fallidos
+    sin_reporte, fallidas = indice.faltantes(imagenes)
     
     print(f"------------------------------------------------")
-    print(f"Imágenes que NO aparecen en el Excel: {len(faltantes)}")
+    print(f"Imágenes que NO aparecen en el Excel: {len(sin_reporte)}")
+    print(f"Imágenes con reporte fallido: {len(fallidas)}")
     print(f"------------------------------------------------")
     
-    if len(faltantes) > 0:
+    if sin_reporte or fallidas:
         print("LISTA DE FALTANTES:")
-        for falta in faltantes:
-            print(f" - {falta}")
+        for img in sin_reporte:
+            print(f" - {img['rel_path']}")
+        for img in fallidas:
+            print(f" - {img['rel_path']} (fallida)")
+        print("(El servidor las vuelve a pedir al arrancar con RETOMAR = True)")
     else:
-        diff = total_archivos_sistema - len(archivos_en_carpeta)
         print("¡TODO PERFECTO! Todas las imágenes válidas están en el Excel.")
-        if diff > 0:
-            print(f"(La diferencia de {diff} archivos son cosas de sistema como Thumbs.db o carpetas ocultas)")
 
 if __name__ == "__main__":
     encontrar_faltantes()
\ No newline at end of file